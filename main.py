@@ -1,26 +1,43 @@
+import atexit
+import bisect
+import calendar
+import heapq
 import json
 import os
 import uuid
 import math
+import mmap
 import random
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
+from functools import lru_cache, partial
 from datetime import date, datetime, timedelta
 import tkinter as tk
 import tkinter.font as tkfont
 from tkinter import ttk, messagebox, filedialog
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 APP_TITLE = "My Diary"
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 DATA_FILE = os.path.join(DATA_DIR, "storage.json")
 
 CATEGORIES = ["生活", "学习", "班团事务", "运动", "其他"]
-CATEGORY_COLORS = {
+DEFAULT_CATEGORY_COLOR = "#E8E8E8"
+CATEGORY_COLORS = defaultdict(lambda: DEFAULT_CATEGORY_COLOR, {
     "生活": "#CFE8FF",
     "学习": "#DFF2D8",
     "班团事务": "#FFE6CC",
     "运动": "#D9F5D6",
     "其他": "#E8E0FF",
-}
+})
+CAT_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+COLOR_BY_INDEX = [CATEGORY_COLORS[c] for c in CATEGORIES] + [DEFAULT_CATEGORY_COLOR]
 
 MOODS = [
     "开心 😄", "平静 😌", "感恩 🙏", "充满希望 🌈",
@@ -52,10 +69,27 @@ for _entry in MOODS:
         if _text in BAD_MOOD_TEXTS:
             BAD_MOOD_EMOJIS.add(_emoji)
 
+_MOOD_GRID_COLS = 8
+_MOOD_GRID_POS = [(i // _MOOD_GRID_COLS, i % _MOOD_GRID_COLS) for i in range(len(MOODS))]
+_MOOD_GRID_ROWS = _MOOD_GRID_POS[-1][0] + 1
+
 MOOD_GOOD_BG = "#E7F7E8"
 MOOD_BAD_BG = "#FBE7E7"
 WEEKDAY_FULL_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-WEEKDAY_FANCY_FONT = ("Segoe Script", 11, "bold")
+WEEKDAY_FANCY_FONT = "AppWeekday"
+APP_FONTS = {
+    "AppBody": {"family": "Microsoft YaHei", "size": 11},
+    "AppSmall": {"family": "Microsoft YaHei", "size": 10},
+    "AppBold": {"family": "Microsoft YaHei", "size": 11, "weight": "bold"},
+    "AppMedium": {"family": "Microsoft YaHei", "size": 12, "weight": "bold"},
+    "AppLarge": {"family": "Microsoft YaHei", "size": 13},
+    "AppLargeBold": {"family": "Microsoft YaHei", "size": 13, "weight": "bold"},
+    "AppH2": {"family": "Microsoft YaHei", "size": 14, "weight": "bold"},
+    "AppH1": {"family": "Microsoft YaHei", "size": 16, "weight": "bold"},
+    "AppTime": {"family": "Microsoft YaHei", "size": 28, "weight": "bold"},
+    "AppSerifBold": {"family": "SimSun", "size": 11, "weight": "bold"},
+    "AppWeekday": {"family": "Segoe Script", "size": 11, "weight": "bold"},
+}
 
 APP_BG = "#EEF5FF"
 BUTTON_BG = "#D6EBFF"
@@ -111,6 +145,19 @@ THEMES = {
 TIME_START = 6
 TIME_END = 22
 
+WAL_MAX_BYTES = 256 * 1024
+WAL_MAX_RECORDS = 500
+SAVE_DEBOUNCE_MS = 250
+WEEK_LEFT_MARGIN = 70
+WEEK_TOP_MARGIN = 10
+WEEK_ROW_HEIGHT = 60
+ARCHIVE_CHUNK_SIZE = 100
+PENDING_FLUSH_MS = 2000
+MOOD_DISMISS_SPEED = 5.0
+ARCHIVE_TITLE_TABLE = str.maketrans("\n", " ")
+MOUSEWHEEL_DELTA = 120
+STATS_POLL_MS = 15
+
 
 @dataclass
 class Event:
@@ -132,71 +179,528 @@ class ArchiveItem:
     media: list
 
 
+def _event_start(event: dict) -> int:
+    return event["_sm"]
+
+
+def _parse_hm(time_str: str) -> int:
+    # data on disk may hold unpadded times such as "9:30"
+    h, m = time_str.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _parse_hm_padded(time_str: str) -> int:
+    # only for times already checked against _TIME_RE
+    return int(time_str[:2]) * 60 + int(time_str[3:5])
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def _json_loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_atomic(path: str, payload: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _json_loads_buffer(buf):
+    if orjson is not None:
+        with memoryview(buf) as view:
+            return orjson.loads(view)
+    return json.loads(buf[:])
+
+
 class Storage:
     def __init__(self, file_path: str):
         self.file_path = file_path
+        self.wal_path = file_path + ".wal"
         self.data = {"events": [], "archives": [], "moods": {}, "pomodoro_records": []}
+        self._wal_records = 0
+        self._pending_wal = []
+        self._dirty = False
+        self._flush_after = None
+        self._tk_after = None
         self._ensure()
         self.load()
+        fd = os.open(self.wal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.wal_fp = os.fdopen(fd, "ab")
+        atexit.register(self.sync_all)
+
+    def bind_scheduler(self, tk_after):
+        self._tk_after = tk_after
 
     def _ensure(self):
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
         if not os.path.exists(self.file_path):
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            _write_atomic(self.file_path, _json_dumps(self.data))
 
     def load(self):
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            self.data = json.load(f)
-        if "events" not in self.data:
-            self.data["events"] = []
-        if "archives" not in self.data:
-            self.data["archives"] = []
-        if "moods" not in self.data:
-            self.data["moods"] = {}
-        if "pomodoro_records" not in self.data:
-            self.data["pomodoro_records"] = []
+        loaded = {}
+        with open(self.file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    loaded = _json_loads_buffer(mm)
+        self.data = {"events": [], "archives": [], "moods": {}, "pomodoro_records": [], **loaded}
+        self._events_by_date = {}
+        for e in self.data["events"]:
+            self._decorate_event(e)
+            self._events_by_date.setdefault(e["_ord"], []).append(e)
+        # buckets stay ordered by start minute so overlap checks can bisect
+        for bucket in self._events_by_date.values():
+            bucket.sort(key=_event_start)
+        self._event_ords = sorted(self._events_by_date)
+        self._event_idx = {e["id"]: i for i, e in enumerate(self.data["events"])}
+        self._archive_idx = {a["id"]: i for i, a in enumerate(self.data["archives"])}
+        self._archive_dates = []
+        self._archives_sorted = []
+        self._archives_by_category = {}
+        # reversed first so equal dates keep list order in the newest-first views
+        for a in sorted(reversed(self.data["archives"]), key=lambda x: x["date"]):
+            self._index_archive(a, bisect.bisect_right)
+        self._wal_records = self._replay_wal()
+        if self._wal_records:
+            self._compact()
 
     def save(self):
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        self._dirty = True
+        if self._tk_after is None:
+            self.flush()
+        elif self._flush_after is None:
+            self._flush_after = self._tk_after(SAVE_DEBOUNCE_MS, self.flush)
+
+    def flush(self):
+        self._flush_after = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        if self._pending_wal:
+            self.wal_fp.write(b"".join(self._pending_wal))
+            self.wal_fp.flush()
+            self._wal_records += len(self._pending_wal)
+            self._pending_wal = []
+        if self._wal_records > WAL_MAX_RECORDS or self.wal_fp.tell() > WAL_MAX_BYTES:
+            self._compact()
+
+    def sync_all(self):
+        self.flush()
+        if not self.wal_fp.closed:
+            os.fsync(self.wal_fp.fileno())
+
+    def _replay_wal(self):
+        if not os.path.exists(self.wal_path):
+            return 0
+        count = 0
+        with open(self.wal_path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = _json_loads(line)
+                except ValueError:
+                    # torn tail from an interrupted append; compaction drops it
+                    break
+                self._apply(rec)
+                count += 1
+        return count
+
+    def _apply(self, rec: dict):
+        op = rec["op"]
+        if op == "add_event":
+            event = self._decorate_event(rec["event"])
+            self.data["events"].append(event)
+            self._event_idx[event["id"]] = len(self.data["events"]) - 1
+            self._bucket_event(event)
+        elif op == "update_event":
+            event = self._decorate_event(rec["event"])
+            i = self._event_idx.get(event["id"])
+            if i is not None:
+                self._unbucket_event(self.data["events"][i])
+                self.data["events"][i] = event
+                self._bucket_event(event)
+        elif op == "delete_event":
+            i = self._event_idx.get(rec["id"])
+            if i is not None:
+                self._unbucket_event(self.data["events"][i])
+                self._swap_pop(self.data["events"], self._event_idx, rec["id"])
+        elif op == "add_archive":
+            item = rec["item"]
+            self.data["archives"].append(item)
+            self._archive_idx[item["id"]] = len(self.data["archives"]) - 1
+            self._index_archive(item, bisect.bisect_left)
+        elif op == "delete_archive":
+            i = self._archive_idx.get(rec["id"])
+            if i is not None:
+                self._unindex_archive(self.data["archives"][i])
+                self._swap_pop(self.data["archives"], self._archive_idx, rec["id"])
+        elif op == "set_mood":
+            self.data.setdefault("moods", {})[rec["date"]] = rec["emoji"]
+        elif op == "add_pomodoro_record":
+            self.data.setdefault("pomodoro_records", []).append(rec["record"])
+        elif op == "add_pomodoro_records":
+            self.data.setdefault("pomodoro_records", []).extend(rec["records"])
+
+    def _decorate_event(self, event: dict):
+        # derived fields are prefixed with "_" and never persisted
+        event["_ord"] = date.fromisoformat(event["date"]).toordinal()
+        event["_sm"] = _parse_hm(event["start"])
+        event["_em"] = _parse_hm(event["end"])
+        event["_dur"] = max(0, event["_em"] - event["_sm"])
+        event["_ci"] = CAT_INDEX.get(event["category"], len(CATEGORIES))
+        return event
+
+    def _bucket_event(self, event: dict):
+        bucket = self._events_by_date.get(event["_ord"])
+        if bucket is None:
+            bucket = self._events_by_date[event["_ord"]] = []
+            bisect.insort(self._event_ords, event["_ord"])
+        bisect.insort_right(bucket, event, key=_event_start)
+
+    def _unbucket_event(self, event: dict):
+        bucket = self._events_by_date.get(event["_ord"])
+        if not bucket:
+            return
+        for j in range(bisect.bisect_left(bucket, event["_sm"], key=_event_start), len(bucket)):
+            if bucket[j] is event:
+                del bucket[j]
+                break
+        if not bucket:
+            del self._events_by_date[event["_ord"]]
+            del self._event_ords[bisect.bisect_left(self._event_ords, event["_ord"])]
+
+    def _index_archive(self, item: dict, bisector):
+        by_cat = self._archives_by_category.setdefault(item["category"], ([], []))
+        for dates, items in ((self._archive_dates, self._archives_sorted), by_cat):
+            i = bisector(dates, item["date"])
+            dates.insert(i, item["date"])
+            items.insert(i, item)
+
+    def _unindex_archive(self, item: dict):
+        by_cat = self._archives_by_category.get(item["category"], ([], []))
+        for dates, items in ((self._archive_dates, self._archives_sorted), by_cat):
+            i = bisect.bisect_left(dates, item["date"])
+            while i < len(items) and items[i] is not item:
+                i += 1
+            if i < len(items):
+                del dates[i]
+                del items[i]
+
+    def archives_desc(self, category=None):
+        if category is None:
+            return self._archives_sorted[::-1]
+        return self._archives_by_category.get(category, ([], []))[1][::-1]
+
+    def get_event(self, event_id: str):
+        i = self._event_idx.get(event_id)
+        return None if i is None else self.data["events"][i]
+
+    def events_on_day(self, day_ord: int):
+        return self._events_by_date.get(day_ord, ())
+
+    def events_overlapping(self, day_ord: int, start_min: int, end_min: int):
+        bucket = self._events_by_date.get(day_ord, ())
+        # only events starting before end_min can overlap; their end decides the rest
+        stop = bisect.bisect_left(bucket, end_min, key=_event_start)
+        return [e for e in bucket[:stop] if e["_em"] > start_min]
+
+    def events_for_range(self, start_ord: int, end_ord: int):
+        ords = self._event_ords
+        events = []
+        for day_ord in ords[bisect.bisect_left(ords, start_ord):bisect.bisect_right(ords, end_ord)]:
+            events.extend(self._events_by_date[day_ord])
+        return events
+
+    def _snapshot(self):
+        events = [{k: v for k, v in e.items() if not k.startswith("_")} for e in self.data["events"]]
+        return {**self.data, "events": events}
+
+    def _swap_pop(self, items: list, index: dict, item_id: str):
+        i = index.pop(item_id, None)
+        if i is None:
+            return
+        last = items.pop()
+        if i < len(items):
+            items[i] = last
+            index[last["id"]] = i
 
-    def add_event(self, event: Event):
-        self.data["events"].append(asdict(event))
+    def _append_wal(self, rec: dict):
+        self._pending_wal.append(_json_dumps(rec) + b"\n")
+
+    def _commit(self, rec: dict):
+        self._append_wal(rec)
+        self._apply(rec)
         self.save()
 
+    def _compact(self):
+        _write_atomic(self.file_path, _json_dumps(self._snapshot()))
+        wal_fp = getattr(self, "wal_fp", None)
+        if wal_fp is not None:
+            wal_fp.truncate(0)
+            wal_fp.seek(0)
+        elif os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self._wal_records = 0
+
+    def export_pretty(self, path: str):
+        self.flush()
+        with open(path, "wb") as f:
+            f.write(_json_dumps(self._snapshot(), indent=True))
+
+    def add_event(self, event: Event):
+        self._commit({"op": "add_event", "event": asdict(event)})
+
     def update_event(self, event: Event):
-        for i, item in enumerate(self.data["events"]):
-            if item["id"] == event.id:
-                self.data["events"][i] = asdict(event)
-                self.save()
-                return
+        self._commit({"op": "update_event", "event": asdict(event)})
 
     def delete_event(self, event_id: str):
-        self.data["events"] = [e for e in self.data["events"] if e["id"] != event_id]
-        self.save()
+        self._commit({"op": "delete_event", "id": event_id})
 
     def add_archive(self, item: ArchiveItem):
-        self.data["archives"].append(asdict(item))
-        self.save()
+        self._commit({"op": "add_archive", "item": asdict(item)})
 
     def delete_archive(self, item_id: str):
-        self.data["archives"] = [a for a in self.data["archives"] if a["id"] != item_id]
-        self.save()
+        self._commit({"op": "delete_archive", "id": item_id})
 
     def set_mood(self, date_str: str, emoji: str):
-        self.data.setdefault("moods", {})[date_str] = emoji
-        self.save()
+        self._commit({"op": "set_mood", "date": date_str, "emoji": emoji})
 
     def add_pomodoro_record(self, record: dict):
-        self.data.setdefault("pomodoro_records", []).append(record)
-        self.save()
+        self._commit({"op": "add_pomodoro_record", "record": record})
+
+    def add_pomodoro_records_bulk(self, records: list):
+        if records:
+            self._commit({"op": "add_pomodoro_records", "records": list(records)})
+
+
+def _layout_columns(starts, ends):
+    n = len(starts)
+    order = sorted(range(n), key=lambda i: (starts[i], ends[i]))
+    cols = [0] * n
+    widths = [1] * n
+    active = []  # min-heap of (end, index)
+    used_mask = 0
+    cluster = []
+    cluster_cols = 0
+    for i in order:
+        start = starts[i]
+        while active and active[0][0] <= start:
+            used_mask &= ~(1 << cols[heapq.heappop(active)[1]])
+        if not active:
+            for j in cluster:
+                widths[j] = cluster_cols
+            cluster = []
+            cluster_cols = 0
+        # lowest clear bit of the mask is the first free column
+        col = (~used_mask & (used_mask + 1)).bit_length() - 1
+        cols[i] = col
+        used_mask |= 1 << col
+        heapq.heappush(active, (ends[i], i))
+        cluster.append(i)
+        if col + 1 > cluster_cols:
+            cluster_cols = col + 1
+    for j in cluster:
+        widths[j] = cluster_cols
+    return order, cols, widths
+
+
+_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+_TIME_RE = re.compile(r"^(\d{2}):(\d{2})$")
+
+
+def _parse_date(date_str: str) -> date:
+    m = _DATE_RE.match(date_str)
+    if not m:
+        raise ValueError(f"invalid date: {date_str!r}")
+    return date(int(m[1]), int(m[2]), int(m[3]))
+
+
+def _split_existing(paths):
+    # one directory listing per parent instead of a stat per file
+    listings = {}
+    existing, missing = [], []
+    for path in paths:
+        parent, name = os.path.split(os.path.abspath(path))
+        names = listings.get(parent)
+        if names is None:
+            try:
+                with os.scandir(parent) as it:
+                    names = {entry.name for entry in it}
+            except OSError:
+                names = set()
+            listings[parent] = names
+        if name in names or os.path.exists(path):
+            existing.append(path)
+        else:
+            missing.append(path)
+    return existing, missing
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(total: int) -> str:
+    m = total // 60
+    s = total % 60
+    return f"{m:02d}:{s:02d}"
+
+
+@lru_cache(maxsize=256)
+def _week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+@lru_cache(maxsize=64)
+def _week_range_text(start: date) -> str:
+    end = start + timedelta(days=6)
+    return f"{start.strftime('%Y/%m/%d')} - {end.strftime('%Y/%m/%d')}"
+
+
+@lru_cache(maxsize=2)
+def _build_week_selector_options(today_ord: int) -> tuple:
+    today = date.fromordinal(today_ord)
+    options = []
+    for i in range(0, 53):
+        start = _week_start(today + timedelta(weeks=i))
+        end = start + timedelta(days=6)
+        iso = start.isocalendar()
+        options.append(f"{iso[0]} 第{iso[1]}周 ({start.strftime('%m/%d')}-{end.strftime('%m/%d')})")
+    return tuple(options)
+
+
+def _compute_stats_data(spans: list) -> list:
+    # spans are (category index, minutes) pairs copied off the Tk thread
+    totals = [0] * (len(CATEGORIES) + 1)
+    for ci, dur in spans:
+        totals[ci] += dur
+    totals[CAT_INDEX["其他"]] += totals.pop()
+    return totals
+
+
+@lru_cache(maxsize=None)
+def _build_styles(theme_name: str):
+    theme = THEMES[theme_name]
+    button_map = {"background": [("active", theme["button_bg_active"]), ("pressed", theme["button_bg_pressed"])]}
+    configs = [
+        ("TFrame", {"background": theme["app_bg"]}),
+        ("TLabel", {"background": theme["app_bg"], "foreground": theme["fg"], "font": "AppBody"}),
+        ("TEntry", {"font": "AppBody"}),
+        ("TCombobox", {"font": "AppBody"}),
+        (
+            "TButton",
+            {
+                "padding": (8, 4),
+                "font": "AppBody",
+                "background": theme["button_bg"],
+                "foreground": theme["fg"],
+                "borderwidth": 1,
+                "relief": "flat",
+            },
+        ),
+        (
+            "Mini.TButton",
+            {
+                "padding": (4, 2),
+                "font": "AppSmall",
+                "background": theme["button_bg"],
+                "foreground": theme["fg"],
+                "borderwidth": 1,
+                "relief": "flat",
+            },
+        ),
+        (
+            "Weekday.TButton",
+            {
+                "padding": (6, 4),
+                "font": WEEKDAY_FANCY_FONT,
+                "background": theme["button_bg"],
+                "foreground": theme["fg"],
+                "borderwidth": 1,
+                "relief": "flat",
+            },
+        ),
+        ("TNotebook", {"background": theme["app_bg"], "borderwidth": 0}),
+        (
+            "TNotebook.Tab",
+            {
+                "background": theme["tab_bg"],
+                "padding": (14, 6),
+                "font": "AppBody",
+                "foreground": theme["fg"],
+            },
+        ),
+        (
+            "Vertical.TScrollbar",
+            {
+                "troughcolor": theme["scroll_trough"],
+                "background": theme["scroll_thumb"],
+                "bordercolor": theme["scroll_trough"],
+                "lightcolor": theme["scroll_thumb"],
+                "darkcolor": theme["scroll_thumb"],
+                "relief": "flat",
+            },
+        ),
+        (
+            "Slim.Vertical.TScrollbar",
+            {
+                "width": 14,
+                "arrowsize": 0,
+                "troughcolor": "#EAF2FF",
+                "background": "#B8D6FF",
+                "bordercolor": "#EAF2FF",
+                "lightcolor": "#B8D6FF",
+                "darkcolor": "#B8D6FF",
+                "relief": "flat",
+            },
+        ),
+        (
+            "Archive.Treeview",
+            {
+                "background": theme["list_bg"],
+                "fieldbackground": theme["list_bg"],
+                "foreground": theme["fg"],
+                "rowheight": 34,
+                "borderwidth": 0,
+            },
+        ),
+        (
+            "Archive.Treeview.Heading",
+            {"background": theme["button_bg"], "foreground": theme["fg"], "font": "AppSerifBold"},
+        ),
+        ("Status.TFrame", {"background": theme["panel_bg"]}),
+    ]
+    maps = [
+        ("TButton", button_map),
+        ("Mini.TButton", button_map),
+        ("Weekday.TButton", button_map),
+        (
+            "TNotebook.Tab",
+            {
+                "background": [("selected", theme["tab_bg_selected"]), ("active", theme["tab_bg_active"])],
+                "foreground": [("selected", theme["fg"]), ("active", theme["fg"]), ("!disabled", theme["fg"])],
+            },
+        ),
+    ]
+    return configs, maps
 
 
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.theme_name = self._auto_theme_name()
+        self._last_auto_theme = self.theme_name
         self.theme = THEMES[self.theme_name]
         self.title(APP_TITLE)
         self.geometry("1100x720")
@@ -205,155 +709,108 @@ class App(tk.Tk):
         self._setup_fonts()
 
         self.storage = Storage(DATA_FILE)
+        self.storage.bind_scheduler(self.after)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.bind("<FocusOut>", self._on_focus_out, add="+")
         self.selected_day = date.today()
         self.week_start = self._week_start(date.today())
         self.day_list_ids = []
+        self._day_list_lines = []
         self.archive_list_ids = []
         self.highlight_day = None
         self.highlight_active = False
+        self._flash_after_id = None
+        self._flash_phase = 0
         self.week_grid = None
         self.week_col_rects = []
+        self._week_lit_col = -1
+        self._week_fill_theme = None
         self._pomodoro_after_id = None
         self.pomodoro_start_ts = None
         self.pomodoro_total_seconds = 0
+        self.pomodoro_running = False
+        self.pomodoro_remaining = 0
+        self._pending_storage_writes = []
+        self._last_display_text = None
+        self._mood_overlay = None
+        self._applied_theme_name = None
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        self._stats_executor = ThreadPoolExecutor(max_workers=1)
+        self._stats_generation = 0
+        self._flush_after_id = None
         self.pomodoro_records = self.storage.data.get("pomodoro_records", [])
-        self.pomodoro_records_seconds = [r.get("seconds", 0) for r in self.pomodoro_records]
+        self._pomodoro_total_seconds_cached = sum(r.get("seconds", 0) for r in self.pomodoro_records)
 
         self._build_ui()
         self._apply_theme()
         self._schedule_theme_check()
         self._refresh_all()
 
+    def _on_close(self):
+        self._flush_pending()
+        self.storage.sync_all()
+        self._io_pool.shutdown(wait=False)
+        self._stats_executor.shutdown(wait=False)
+        self.destroy()
+
+    def export_pretty(self):
+        path = filedialog.asksaveasfilename(
+            title="导出数据",
+            defaultextension=".json",
+            initialfile="diary_export.json",
+            filetypes=[("JSON", "*.json")],
+        )
+        if not path:
+            return
+        self.storage.export_pretty(path)
+        messagebox.showinfo("提示", "导出完成")
+
+    def _on_focus_out(self, _event=None):
+        self.after_idle(self._sync_if_unfocused)
+
+    def _sync_if_unfocused(self):
+        try:
+            focused = self.focus_get()
+        except KeyError:
+            focused = None
+        if focused is None:
+            self.storage.sync_all()
+
     def _setup_fonts(self):
         default_font = tkfont.nametofont("TkDefaultFont")
         default_font.configure(family="Microsoft YaHei", size=11)
         for name in ["TkTextFont", "TkFixedFont", "TkMenuFont", "TkHeadingFont"]:
             tkfont.nametofont(name).configure(family="Microsoft YaHei", size=11)
+        self._fonts = [tkfont.Font(self, name=name, **spec) for name, spec in APP_FONTS.items()]
         self.option_add("*Font", default_font)
-        self.option_add("*Listbox.Font", ("Microsoft YaHei", 11))
-        self.option_add("*Text.Font", ("Microsoft YaHei", 11))
+        self.option_add("*Listbox.Font", "AppBody")
+        self.option_add("*Text.Font", "AppBody")
 
     def _build_ui(self):
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
-        self.style.configure("TFrame", background=self.theme["app_bg"])
-        self.style.configure("TLabel", background=self.theme["app_bg"], foreground=self.theme["fg"])
-        self.style.configure(
-            "TButton",
-            padding=(8, 4),
-            font=("Microsoft YaHei", 11),
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-            borderwidth=1,
-            relief="flat",
-        )
-        self.style.map(
-            "TButton",
-            background=[("active", self.theme["button_bg_active"]), ("pressed", self.theme["button_bg_pressed"])],
-        )
-        self.style.configure("TLabel", font=("Microsoft YaHei", 11), foreground=self.theme["fg"])
-        self.style.configure("TEntry", font=("Microsoft YaHei", 11))
-        self.style.configure("TCombobox", font=("Microsoft YaHei", 11))
-        self.style.configure(
-            "Mini.TButton",
-            padding=(4, 2),
-            font=("Microsoft YaHei", 10),
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-            borderwidth=1,
-            relief="flat",
-        )
-        self.style.map(
-            "Mini.TButton",
-            background=[("active", self.theme["button_bg_active"]), ("pressed", self.theme["button_bg_pressed"])],
-        )
-        self.style.configure(
-            "Weekday.TButton",
-            padding=(6, 4),
-            font=WEEKDAY_FANCY_FONT,
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-            borderwidth=1,
-            relief="flat",
-        )
-        self.style.map(
-            "Weekday.TButton",
-            background=[("active", self.theme["button_bg_active"]), ("pressed", self.theme["button_bg_pressed"])],
-        )
-        self.style.configure("TNotebook", background=self.theme["app_bg"], borderwidth=0)
-        self.style.configure(
-            "TNotebook.Tab",
-            background=self.theme["tab_bg"],
-            padding=(14, 6),
-            font=("Microsoft YaHei", 11),
-            foreground=self.theme["fg"],
-        )
-        self.style.map(
-            "TNotebook.Tab",
-            background=[("selected", self.theme["tab_bg_selected"]), ("active", self.theme["tab_bg_active"])],
-            foreground=[("selected", self.theme["fg"]), ("active", self.theme["fg"]), ("!disabled", self.theme["fg"])],
-        )
-        self.style.layout(
-            "Vertical.TScrollbar",
-            [
-                (
-                    "Vertical.Scrollbar.trough",
-                    {"children": [("Vertical.Scrollbar.thumb", {"sticky": "nswe"})], "sticky": "ns"},
-                )
-            ],
-        )
-        self.style.configure(
-            "Vertical.TScrollbar",
-            troughcolor=self.theme["scroll_trough"],
-            background=self.theme["scroll_thumb"],
-            bordercolor=self.theme["scroll_trough"],
-            lightcolor=self.theme["scroll_thumb"],
-            darkcolor=self.theme["scroll_thumb"],
-            relief="flat",
-        )
-        self.style.layout(
-            "Slim.Vertical.TScrollbar",
-            [
-                (
-                    "Vertical.Scrollbar.trough",
-                    {"children": [("Vertical.Scrollbar.thumb", {"sticky": "nswe"})], "sticky": "ns"},
-                )
-            ],
-        )
-        self.style.configure(
-            "Slim.Vertical.TScrollbar",
-            width=14,
-            arrowsize=0,
-            troughcolor="#EAF2FF",
-            background="#B8D6FF",
-            bordercolor="#EAF2FF",
-            lightcolor="#B8D6FF",
-            darkcolor="#B8D6FF",
-            relief="flat",
-        )
-        self.style.configure(
-            "Archive.Treeview",
-            background="#FFFFFF",
-            fieldbackground="#FFFFFF",
-            foreground="#1F3B57",
-            rowheight=34,
-            borderwidth=0,
-        )
-        self.style.configure(
-            "Archive.Treeview.Heading",
-            background="#DCEBFF",
-            foreground="#1F3B57",
-            font=("SimSun", 11, "bold"),
-        )
+        self._last_theme_cfg = {}
+        self._last_theme_maps = {}
+        scrollbar_layout = [
+            (
+                "Vertical.Scrollbar.trough",
+                {"children": [("Vertical.Scrollbar.thumb", {"sticky": "nswe"})], "sticky": "ns"},
+            )
+        ]
+        self.style.layout("Vertical.TScrollbar", scrollbar_layout)
+        self.style.layout("Slim.Vertical.TScrollbar", scrollbar_layout)
+        self._apply_styles()
 
         header = ttk.Frame(self)
         header.pack(fill="x", padx=16, pady=10)
 
-        ttk.Label(header, text=APP_TITLE, font=("Microsoft YaHei", 16, "bold")).pack(side="left")
+        ttk.Label(header, text=APP_TITLE, font="AppH1").pack(side="left")
         ttk.Button(header, text="+ 添加日程", command=self._open_add_event).pack(side="right")
+        ttk.Button(header, text="导出", command=self.export_pretty).pack(side="right", padx=6)
 
         self.tabs = ttk.Notebook(self)
         self.tabs.pack(fill="both", expand=True, padx=16, pady=8)
+        self.tabs.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
         self.week_tab = ttk.Frame(self.tabs)
         self.month_tab = ttk.Frame(self.tabs)
@@ -369,9 +826,12 @@ class App(tk.Tk):
 
         self._build_week_tab()
         self._build_month_tab()
-        self._build_stats_tab()
-        self._build_pomodoro_tab()
-        self._build_archive_tab()
+        self._tab_builders = {
+            str(self.stats_tab): self._build_stats_tab,
+            str(self.pomodoro_tab): self._build_pomodoro_tab,
+            str(self.archive_tab): self._build_archive_tab,
+        }
+        self._built_tabs = set()
 
         self.status_bar = ttk.Frame(self, style="Status.TFrame")
         self.status_bar.pack(side="bottom", fill="x")
@@ -384,6 +844,13 @@ class App(tk.Tk):
 
         self.after(100, self._show_mood_prompt)
 
+    def _on_tab_changed(self, _event=None):
+        tab = self.tabs.select()
+        if tab not in self._built_tabs and tab in self._tab_builders:
+            self._built_tabs.add(tab)
+            self._tab_builders[tab]()
+        self.storage.sync_all()
+
     # ---------- Week Tab ----------
     def _build_week_tab(self):
         top = ttk.Frame(self.week_tab)
@@ -411,12 +878,50 @@ class App(tk.Tk):
         self.week_window_id = self.week_canvas.create_window((0, 0), window=self.week_inner, anchor="nw")
         self.week_inner.bind("<Configure>", lambda e: self.week_canvas.configure(scrollregion=self.week_canvas.bbox("all")))
 
+        self.week_header = ttk.Frame(self.week_inner)
+        self.week_header.pack(fill="x")
+        self.week_header.pack_propagate(False)
+        self.week_header.grid_columnconfigure(0, minsize=WEEK_LEFT_MARGIN, weight=0)
+        ttk.Label(self.week_header, text="时间", anchor="center").grid(row=0, column=0, sticky="nsew")
+        self._weekday_btns = []
+        for i in range(7):
+            btn = ttk.Button(
+                self.week_header,
+                style="Weekday.TButton",
+                command=lambda i=i: self._open_day_detail_window(self.week_start + timedelta(days=i)),
+            )
+            btn.grid(row=0, column=i + 1, sticky="nsew")
+            self._weekday_btns.append(btn)
+
+        grid_bottom = WEEK_TOP_MARGIN + (TIME_END - TIME_START) * WEEK_ROW_HEIGHT
+        grid_height = max(680, int((TIME_END - TIME_START) * WEEK_ROW_HEIGHT + 40))
+        grid = tk.Canvas(self.week_inner, bg=self.theme["canvas_bg"], height=grid_height, highlightthickness=0)
+        grid.pack(fill="both", expand=True)
+        self.week_grid = grid
+
+        self.week_col_rects = []
+        for i in range(7):
+            rect_id = grid.create_rectangle(0, WEEK_TOP_MARGIN, 0, grid_bottom, outline="")
+            grid.tag_bind(rect_id, "<Button-1>", lambda _e, i=i: self._open_day_detail_window(self.week_start + timedelta(days=i)))
+            self.week_col_rects.append(rect_id)
+        self._week_lit_col = -1
+        self._week_fill_theme = None
+        self._week_hour_items = []
+        for hour in range(TIME_START, TIME_END + 1):
+            text_id = grid.create_text(0, 0, text=f"{hour:02d}:00", anchor="e", tags=("week_hour_text",))
+            line_id = grid.create_line(0, 0, 0, 0, tags=("week_grid_line",))
+            self._week_hour_items.append((hour, text_id, line_id))
+        self._week_col_lines = [grid.create_line(0, 0, 0, 0, tags=("week_grid_line",)) for _ in range(7)]
+        self._event_canvas_ids = {}
+        self._week_layout_key = None
+        self._week_theme_key = None
+
         self.day_detail = ttk.Frame(body, width=260)
         self.day_detail.pack(side="left", fill="y", padx=10)
 
-        ttk.Label(self.day_detail, text="当天计划", font=("Microsoft YaHei", 11, "bold")).pack(anchor="w", pady=(2, 6))
+        ttk.Label(self.day_detail, text="当天计划", font="AppBold").pack(anchor="w", pady=(2, 6))
         self.day_label = ttk.Label(self.day_detail, text="")
-        self.day_label.configure(font=("Microsoft YaHei", 13, "bold"))
+        self.day_label.configure(font="AppLargeBold")
         self.day_label.pack(anchor="w", pady=(0, 8))
 
         self.day_list = tk.Listbox(
@@ -425,7 +930,7 @@ class App(tk.Tk):
             bg=self.theme["list_bg"],
             fg=self.theme["fg"],
             relief="flat",
-            font=("Microsoft YaHei", 13),
+            font="AppLarge",
         )
         self.day_list.pack(fill="both", expand=True)
 
@@ -435,14 +940,7 @@ class App(tk.Tk):
         ttk.Button(btns, text="删除", command=self._delete_selected_event).pack(side="left", padx=4)
 
     def _populate_week_selector(self):
-        options = []
-        today = date.today()
-        for i in range(0, 53):
-            start = self._week_start(today + timedelta(weeks=i))
-            end = start + timedelta(days=6)
-            label = f"{start.isocalendar().year} 第{start.isocalendar().week}周 ({start.strftime('%m/%d')}-{end.strftime('%m/%d')})"
-            options.append(label)
-        self.week_selector["values"] = options
+        self.week_selector["values"] = _build_week_selector_options(date.today().toordinal())
         self.week_selector.current(0)
 
     def _on_week_change(self, _event=None):
@@ -456,115 +954,100 @@ class App(tk.Tk):
         self._select_day(self.selected_day)
 
     def _render_week_grid(self):
-        for child in self.week_inner.winfo_children():
-            child.destroy()
-
-        min_col_width = 70
-        row_height = 60
-        left_margin = 70
-        top_margin = 10
+        grid = self.week_grid
+        col_width_min = 70
+        left_margin = WEEK_LEFT_MARGIN
+        top_margin = WEEK_TOP_MARGIN
+        row_height = WEEK_ROW_HEIGHT
+        grid_bottom = top_margin + (TIME_END - TIME_START) * row_height
 
         available_width = self.week_canvas.winfo_width()
         if available_width <= 1:
             available_width = 900
-        col_width = max(min_col_width, int((available_width - left_margin) / 7))
+        col_width = max(col_width_min, int((available_width - left_margin) / 7))
         total_width = left_margin + col_width * 7
 
-        if self.week_window_id is not None:
-            self.week_canvas.itemconfig(self.week_window_id, width=total_width)
-
-        header = ttk.Frame(self.week_inner)
-        header.pack(fill="x")
-        header.configure(width=total_width)
-        header.pack_propagate(False)
-
-        header.grid_columnconfigure(0, minsize=left_margin, weight=0)
-        for i in range(1, 8):
-            header.grid_columnconfigure(i, minsize=col_width, weight=0)
-
-        ttk.Label(header, text="时间", anchor="center").grid(row=0, column=0, sticky="nsew")
-        for i in range(7):
+        if self._week_layout_key != col_width:
+            self._week_layout_key = col_width
+            if self.week_window_id is not None:
+                self.week_canvas.itemconfig(self.week_window_id, width=total_width)
+            self.week_header.configure(width=total_width)
+            for i in range(1, 8):
+                self.week_header.grid_columnconfigure(i, minsize=col_width, weight=0)
+            grid.configure(width=total_width, scrollregion=(0, 0, total_width + 20, (TIME_END - TIME_START) * row_height + 40))
+            for i, rect_id in enumerate(self.week_col_rects):
+                x1 = left_margin + i * col_width
+                grid.coords(rect_id, x1, top_margin, x1 + col_width, grid_bottom)
+            for hour, text_id, line_id in self._week_hour_items:
+                y = top_margin + (hour - TIME_START) * row_height
+                grid.coords(text_id, left_margin - 10, y)
+                grid.coords(line_id, left_margin, y, total_width, y)
+            for i, line_id in enumerate(self._week_col_lines):
+                x = left_margin + i * col_width
+                grid.coords(line_id, x, top_margin, x, grid_bottom)
+
+        if self._week_theme_key != self.theme_name:
+            self._week_theme_key = self.theme_name
+            self.week_canvas.configure(bg=self.theme["canvas_bg"])
+            self.week_inner.configure(bg=self.theme["canvas_bg"])
+            grid.configure(bg=self.theme["canvas_bg"])
+            grid.itemconfig("week_hour_text", fill=self.theme["fg"])
+            grid.itemconfig("week_grid_line", fill=self.theme["grid_line"])
+
+        for i, btn in enumerate(self._weekday_btns):
             day = self.week_start + timedelta(days=i)
-            btn = ttk.Button(
-                header,
-                text=f"{WEEKDAY_FULL_NAMES[day.weekday()]}\n{day.strftime('%m/%d')}",
-                style="Weekday.TButton",
-                command=lambda d=day: self._open_day_detail_window(d),
-            )
-            btn.grid(row=0, column=i + 1, sticky="nsew")
-
-        grid_height = max(680, int((TIME_END - TIME_START) * row_height + 40))
-        grid = tk.Canvas(self.week_inner, bg=self.theme["canvas_bg"], height=grid_height, width=total_width, highlightthickness=0)
-        grid.pack(fill="both", expand=True)
-        self.week_grid = grid
-
-        grid.configure(scrollregion=(0, 0, total_width + 20, (TIME_END - TIME_START) * row_height + 40))
-
-        highlight_color = self.theme["highlight"]
-        normal_color = self.theme["canvas_bg"]
-        self.week_col_rects = []
-        for i in range(7):
-            x1 = left_margin + i * col_width
-            x2 = x1 + col_width
-            fill = normal_color
-            if self.highlight_active and self.highlight_day:
-                if self.week_start <= self.highlight_day <= self.week_start + timedelta(days=6):
-                    if i == (self.highlight_day - self.week_start).days:
-                        fill = highlight_color
-            rect_id = grid.create_rectangle(
-                x1,
-                top_margin,
-                x2,
-                top_margin + (TIME_END - TIME_START) * row_height,
-                fill=fill,
-                outline="",
-            )
-            grid.tag_bind(rect_id, "<Button-1>", lambda _e, d=self.week_start + timedelta(days=i): self._open_day_detail_window(d))
-            self.week_col_rects.append(rect_id)
-
-        for hour in range(TIME_START, TIME_END + 1):
-            y = top_margin + (hour - TIME_START) * row_height
-            grid.create_text(left_margin - 10, y, text=f"{hour:02d}:00", anchor="e", fill=self.theme["fg"])
-            grid.create_line(left_margin, y, left_margin + col_width * 7, y, fill=self.theme["grid_line"])
-
-        for i in range(7):
-            x = left_margin + i * col_width
-            grid.create_line(x, top_margin, x, top_margin + (TIME_END - TIME_START) * row_height, fill=self.theme["grid_line"])
+            btn.configure(text=f"{WEEKDAY_FULL_NAMES[day.weekday()]}\n{day.strftime('%m/%d')}")
+        self._update_day_highlight()
 
         week_events = self._events_in_week(self.week_start)
         events_by_day = {i: [] for i in range(7)}
+        ws_ord = self.week_start.toordinal()
         for event in week_events:
-            d = datetime.strptime(event["date"], "%Y-%m-%d").date()
-            day_index = (d - self.week_start).days
+            day_index = event["_ord"] - ws_ord
             if 0 <= day_index <= 6:
                 events_by_day[day_index].append(event)
 
+        stale = self._event_canvas_ids
+        current = {}
         for day_index, events in events_by_day.items():
             layouts = self._layout_day_events(events)
             for layout in layouts:
                 event = layout["event"]
-                start_minutes = self._to_minutes(event["start"])
-                end_minutes = self._to_minutes(event["end"])
+                eid = event["id"]
+                start_minutes = event["_sm"]
+                end_minutes = event["_em"]
                 duration = max(end_minutes - start_minutes, 45)
                 start_y = top_margin + (start_minutes / 60 - TIME_START) * row_height
                 end_y = start_y + (duration / 60) * row_height
-                total_width = col_width - 8
+                inner_width = col_width - 8
                 gap = 4
-                slot_width = (total_width - gap * (layout["cols"] - 1)) / layout["cols"]
+                slot_width = (inner_width - gap * (layout["cols"] - 1)) / layout["cols"]
                 x1 = left_margin + day_index * col_width + 4 + layout["col"] * (slot_width + gap)
                 x2 = x1 + slot_width
-                color = CATEGORY_COLORS.get(event["category"], "#E8E8E8")
-                rect = self._create_rounded_rect(grid, x1, start_y, x2, end_y, 8, color, "#C2D6EE")
-                text_id = grid.create_text(x1 + 6, start_y + 6, anchor="nw", text=event["title"], fill="#000000")
-                grid.tag_bind(rect, "<Button-1>", lambda _e, eid=event["id"]: self._select_event_by_id(eid))
-                grid.tag_bind(text_id, "<Button-1>", lambda _e, eid=event["id"]: self._select_event_by_id(eid))
+                color = COLOR_BY_INDEX[event["_ci"]]
+                items = stale.pop(eid, None)
+                if items is None:
+                    rect = self._create_rounded_rect(grid, x1, start_y, x2, end_y, 8, color, "#C2D6EE")
+                    text_id = grid.create_text(x1 + 6, start_y + 6, anchor="nw", text=event["title"], fill="#000000")
+                    grid.tag_bind(rect, "<Button-1>", lambda _e, eid=eid: self._select_event_by_id(eid))
+                    grid.tag_bind(text_id, "<Button-1>", lambda _e, eid=eid: self._select_event_by_id(eid))
+                else:
+                    rect, text_id = items
+                    grid.coords(rect, *self._rounded_rect_points(x1, start_y, x2, end_y, 8))
+                    grid.itemconfig(rect, fill=color)
+                    grid.coords(text_id, x1 + 6, start_y + 6)
+                    grid.itemconfig(text_id, text=event["title"])
+                current[eid] = (rect, text_id)
+        for rect, text_id in stale.values():
+            grid.delete(rect, text_id)
+        self._event_canvas_ids = current
 
     # ---------- Month Tab ----------
     def _build_month_tab(self):
         top = ttk.Frame(self.month_tab)
         top.pack(fill="x", padx=8, pady=8)
 
-        self.month_label = ttk.Label(top, text="", font=("SimSun", 11, "bold"))
+        self.month_label = ttk.Label(top, text="", font="AppSerifBold")
         self.month_label.pack(side="left")
 
         ttk.Button(top, text="上月", command=lambda: self._shift_month(-1)).pack(side="right", padx=4)
@@ -574,6 +1057,43 @@ class App(tk.Tk):
         self.month_frame.pack(fill="both", expand=True, padx=8, pady=6)
 
         self.current_month = date.today().replace(day=1)
+        self._build_month_grid_once()
+
+    def _build_month_grid_once(self):
+        headers = ["一", "二", "三", "四", "五", "六", "日"]
+        header_frame = ttk.Frame(self.month_frame)
+        header_frame.pack(fill="x")
+        for i, h in enumerate(headers):
+            ttk.Label(header_frame, text=h, width=12, anchor="center").grid(row=0, column=i, sticky="nsew")
+
+        cal = ttk.Frame(self.month_frame)
+        cal.pack(fill="both", expand=True)
+
+        self._month_cells = []
+        self._month_slot_dates = [None] * 42
+        self._month_cell_state = [None] * 42
+        for slot in range(42):
+            cell = ttk.Frame(cal, relief="solid", borderwidth=1)
+            cell.grid(row=slot // 7, column=slot % 7, sticky="nsew", padx=2, pady=2)
+            cell.grid_propagate(False)
+            date_chip = tk.Frame(cell, highlightthickness=1)
+            label = tk.Label(date_chip)
+            label.pack(padx=4, pady=1)
+
+            def _open_day(_event, slot=slot):
+                target = self._month_slot_dates[slot]
+                if target is not None:
+                    self._open_day_from_month(target)
+
+            cell.bind("<Button-1>", _open_day)
+            date_chip.bind("<Button-1>", _open_day)
+            label.bind("<Button-1>", _open_day)
+            self._month_cells.append({"cell": cell, "date_chip": date_chip, "day_label": label})
+
+        for i in range(7):
+            cal.grid_columnconfigure(i, weight=1, uniform="month")
+        for r in range(6):
+            cal.grid_rowconfigure(r, weight=1, uniform="month")
 
     # ---------- Stats Tab ----------
     def _build_stats_tab(self):
@@ -596,14 +1116,8 @@ class App(tk.Tk):
         self._render_stats()
 
     def _populate_stats_selector(self):
-        options = []
         today = date.today()
-        for i in range(0, 53):
-            start = self._week_start(today + timedelta(weeks=i))
-            end = start + timedelta(days=6)
-            label = f"{start.isocalendar().year} 第{start.isocalendar().week}周 ({start.strftime('%m/%d')}-{end.strftime('%m/%d')})"
-            options.append(label)
-        self.stats_selector["values"] = options
+        self.stats_selector["values"] = _build_week_selector_options(today.toordinal())
         self.stats_selector.current(0)
         self.stats_week_start = self._week_start(today)
         self.stats_range_label.configure(text=self._week_range_text(self.stats_week_start))
@@ -615,6 +1129,22 @@ class App(tk.Tk):
         self._render_stats()
 
     def _render_stats(self):
+        self._stats_generation += 1
+        # Storage is only touched on the Tk thread; the worker gets a plain snapshot
+        start_ord = self.stats_week_start.toordinal()
+        spans = [(e["_ci"], e["_dur"]) for e in self.storage.events_for_range(start_ord, start_ord + 6)]
+        future = self._stats_executor.submit(_compute_stats_data, spans)
+        self._poll_stats(future, self._stats_generation)
+
+    def _poll_stats(self, future, generation):
+        if generation != self._stats_generation:
+            return
+        if not future.done():
+            self.after(STATS_POLL_MS, self._poll_stats, future, generation)
+            return
+        self._paint_stats(future.result())
+
+    def _paint_stats(self, totals):
         canvas = self.stats_canvas
         canvas.delete("all")
         canvas.configure(bg=self.theme["canvas_bg"])
@@ -631,17 +1161,7 @@ class App(tk.Tk):
         chart_w = width - padding * 2
         chart_h = height - padding * 2 - footer_h
 
-        totals = {c: 0 for c in CATEGORIES}
-        end = self.stats_week_start + timedelta(days=6)
-        for e in self.storage.data["events"]:
-            d = datetime.strptime(e["date"], "%Y-%m-%d").date()
-            if not (self.stats_week_start <= d <= end):
-                continue
-            start_m = self._to_minutes(e["start"])
-            end_m = self._to_minutes(e["end"])
-            totals[e["category"]] += max(0, end_m - start_m)
-
-        max_minutes = max(totals.values()) if totals else 0
+        max_minutes = max(totals)
         max_minutes = max(max_minutes, 60)
 
         left_w = int(chart_w * 0.55)
@@ -651,14 +1171,14 @@ class App(tk.Tk):
         bar_gap = 14
         bar_w = max(24, int((left_w - bar_gap * (bar_count - 1)) / bar_count))
 
+        shadow = "#9FB7D1" if self.theme_name == "light" else "#3A4759"
         for i, cat in enumerate(CATEGORIES):
-            value = totals.get(cat, 0)
+            value = totals[i]
             bar_h = int((value / max_minutes) * chart_h)
             x = padding + i * (bar_w + bar_gap)
             y = padding + (chart_h - bar_h)
 
-            color = CATEGORY_COLORS.get(cat, "#88AADD")
-            shadow = "#9FB7D1" if self.theme_name == "light" else "#3A4759"
+            color = COLOR_BY_INDEX[i]
 
             canvas.create_rectangle(x + 5, y - 5, x + bar_w + 5, y + bar_h - 5, fill=shadow, outline="")
             canvas.create_rectangle(x, y, x + bar_w, y + bar_h, fill=color, outline="")
@@ -684,41 +1204,37 @@ class App(tk.Tk):
         pie_x1 = pie_x0 + pie_size
         pie_y1 = pie_y0 + pie_size
 
-        total_minutes = sum(totals.values())
+        total_minutes = sum(totals)
         if total_minutes <= 0:
             canvas.create_oval(pie_x0, pie_y0, pie_x1, pie_y1, fill=self.theme["button_bg"], outline="")
             canvas.create_text((pie_x0 + pie_x1) / 2, (pie_y0 + pie_y1) / 2, text="暂无数据", fill=self.theme["fg"])
         else:
-            start_angle = 90
-            for cat in CATEGORIES:
-                value = totals.get(cat, 0)
+            cum = [0.0]
+            for value in totals:
+                cum.append(cum[-1] + value / total_minutes * 360)
+            cx = (pie_x0 + pie_x1) / 2
+            cy = (pie_y0 + pie_y1) / 2
+            label_r = pie_size * 0.35
+            for i, value in enumerate(totals):
                 if value <= 0:
                     continue
-                extent = value / total_minutes * 360
-                color = CATEGORY_COLORS.get(cat, "#88AADD")
                 canvas.create_arc(
                     pie_x0,
                     pie_y0,
                     pie_x1,
                     pie_y1,
-                    start=start_angle,
-                    extent=-extent,
-                    fill=color,
+                    start=90 - cum[i],
+                    extent=cum[i] - cum[i + 1],
+                    fill=COLOR_BY_INDEX[i],
                     outline=self.theme["canvas_bg"],
                 )
                 percent = value / total_minutes * 100
-                angle_rad = (start_angle - extent / 2) * 3.14159 / 180
-                label_r = pie_size * 0.35
-                label_x = (pie_x0 + pie_x1) / 2 + label_r * math.cos(angle_rad)
-                label_y = (pie_y0 + pie_y1) / 2 - label_r * math.sin(angle_rad)
+                rad = math.radians(90 - (cum[i] + cum[i + 1]) / 2)
                 # percent label should remain black for readability
-                canvas.create_text(label_x, label_y, text=f"{percent:.0f}%", fill="#000000")
-                start_angle -= extent
+                canvas.create_text(cx + label_r * math.cos(rad), cy - label_r * math.sin(rad), text=f"{percent:.0f}%", fill="#000000")
 
     # ---------- Pomodoro Tab ----------
     def _build_pomodoro_tab(self):
-        self.pomodoro_running = False
-        self.pomodoro_remaining = 0
         self.pomodoro_preset_canvases = []
 
         wrap = ttk.Frame(self.pomodoro_tab)
@@ -735,7 +1251,7 @@ class App(tk.Tk):
             bg=self.theme["list_bg"],
             fg=self.theme["fg"],
             relief="flat",
-            font=("Microsoft YaHei", 11),
+            font="AppBody",
         )
         self.pomodoro_record_list.pack(side="left", fill="both", expand=True)
         record_scroll = ttk.Scrollbar(record_panel, orient="vertical", command=self.pomodoro_record_list.yview)
@@ -749,7 +1265,7 @@ class App(tk.Tk):
         self.pomodoro_focus_label = ttk.Label(
             timer_panel,
             text="你已专注了0小时0分钟",
-            font=("Microsoft YaHei", 14, "bold"),
+            font="AppH2",
             anchor="e",
             justify="right",
         )
@@ -765,7 +1281,7 @@ class App(tk.Tk):
             160,
             160,
             text="00:00:00",
-            font=("Microsoft YaHei", 28, "bold"),
+            font="AppTime",
             fill=self.theme["fg"],
         )
         self._draw_pomodoro_ring()
@@ -789,11 +1305,13 @@ class App(tk.Tk):
         cancel_btn.pack(side="right", padx=16, pady=8)
 
         # populate history and focus summary
-        for rec in self.pomodoro_records:
-            start_text = rec.get("start", "")
-            total_text = self._format_seconds(rec.get("seconds", 0))
-            if start_text:
-                self.pomodoro_record_list.insert("end", f"{start_text}  {total_text}")
+        lines = [
+            f"{rec['start']}  {self._format_seconds(rec.get('seconds', 0))}"
+            for rec in self.pomodoro_records
+            if rec.get("start", "")
+        ]
+        if lines:
+            self.pomodoro_record_list.insert("end", *lines)
         self._update_pomodoro_focus_summary()
 
     def _draw_pomodoro_ring(self):
@@ -846,19 +1364,21 @@ class App(tk.Tk):
         size = 90
         canvas = tk.Canvas(parent, width=size, height=size, bg=self.theme["app_bg"], highlightthickness=0)
         canvas.pack(side="left", padx=12)
-        canvas.create_oval(8, 8, size - 8, size - 8, fill=self.theme["canvas_bg"], outline=self.theme["button_bg"], width=2)
-        canvas.create_text(size / 2, size / 2, text=label, fill=self.theme["fg"], font=("Microsoft YaHei", 12, "bold"))
+        oval_id = canvas.create_oval(8, 8, size - 8, size - 8, fill=self.theme["canvas_bg"], outline=self.theme["button_bg"], width=2)
+        text_id = canvas.create_text(size / 2, size / 2, text=label, fill=self.theme["fg"], font="AppMedium")
 
         def _on_click(_event):
             self._start_pomodoro(minutes * 60)
 
         canvas.bind("<Button-1>", _on_click)
-        self.pomodoro_preset_canvases.append((canvas, label))
+        self.pomodoro_preset_canvases.append((canvas, oval_id, text_id))
 
     def _start_pomodoro(self, seconds: int):
         self.pomodoro_remaining = seconds
         self.pomodoro_total_seconds = seconds
         self.pomodoro_start_ts = datetime.now()
+        self._pomodoro_start_mono = time.monotonic()
+        self._last_shown_remaining = seconds
         self.pomodoro_running = True
         self._update_pomodoro_display()
         # cancel previous scheduled tick if any
@@ -886,11 +1406,14 @@ class App(tk.Tk):
     def _tick_pomodoro(self):
         if not self.pomodoro_running:
             return
-        if self.pomodoro_remaining <= 0:
+        elapsed = time.monotonic() - self._pomodoro_start_mono
+        self.pomodoro_remaining = max(0, int(self.pomodoro_total_seconds - elapsed))
+        if elapsed >= self.pomodoro_total_seconds:
             self.pomodoro_running = False
             self._update_pomodoro_display()
             self._maybe_log_pomodoro()
-            messagebox.showinfo("提示", random.choice([
+            # let the tick return before the modal dialog blocks the loop
+            self.after(0, messagebox.showinfo, "提示", random.choice([
                 "时间到啦，休息一下吧",
                 "时间到啦，你做到了吗",
                 "时间到啦，辛苦了",
@@ -903,9 +1426,12 @@ class App(tk.Tk):
                     pass
                 self._pomodoro_after_id = None
             return
-        self.pomodoro_remaining -= 1
-        self._update_pomodoro_display()
-        self._pomodoro_after_id = self.after(1000, self._tick_pomodoro)
+        if self.pomodoro_remaining != self._last_shown_remaining:
+            self._last_shown_remaining = self.pomodoro_remaining
+            self._update_pomodoro_display()
+        # land on the next whole second so jitter never accumulates
+        delay = int(1000 - (elapsed * 1000) % 1000)
+        self._pomodoro_after_id = self.after(delay, self._tick_pomodoro)
 
     def _maybe_log_pomodoro(self):
         if not self.pomodoro_start_ts or self.pomodoro_total_seconds <= 0:
@@ -916,18 +1442,29 @@ class App(tk.Tk):
         start_text = self.pomodoro_start_ts.strftime("%Y-%m-%d %H:%M:%S")
         total_text = self._format_seconds(self.pomodoro_total_seconds)
         record = {"start": start_text, "seconds": int(self.pomodoro_total_seconds)}
-        self.pomodoro_records.append(record)
-        self.pomodoro_records_seconds.append(self.pomodoro_total_seconds)
-        self.storage.add_pomodoro_record(record)
+        self._pomodoro_total_seconds_cached += self.pomodoro_total_seconds
+        self._pending_storage_writes.append(("pomodoro", record))
+        self._schedule_flush()
         if hasattr(self, "pomodoro_record_list"):
             self.pomodoro_record_list.insert("end", f"{start_text}  {total_text}")
-        self._update_pomodoro_focus_summary()
+        self.after_idle(self._update_pomodoro_focus_summary)
         # avoid duplicate logging for same session
         self.pomodoro_start_ts = None
         self.pomodoro_total_seconds = 0
 
+    def _schedule_flush(self):
+        if self._flush_after_id is None:
+            self._flush_after_id = self.after(PENDING_FLUSH_MS, self._flush_pending)
+
+    def _flush_pending(self):
+        if self._flush_after_id is not None:
+            self.after_cancel(self._flush_after_id)
+            self._flush_after_id = None
+        pending, self._pending_storage_writes = self._pending_storage_writes, []
+        self.storage.add_pomodoro_records_bulk([rec for kind, rec in pending if kind == "pomodoro"])
+
     def _update_pomodoro_focus_summary(self):
-        total_seconds = sum(self.pomodoro_records_seconds)
+        total_seconds = self._pomodoro_total_seconds_cached
         hours = total_seconds // 3600
         minutes = (total_seconds % 3600) // 60
         text = f"你已专注了{hours}小时{minutes}分钟"
@@ -935,25 +1472,23 @@ class App(tk.Tk):
             self.pomodoro_focus_label.config(text=text)
 
     def _format_seconds(self, total: int) -> str:
-        total = max(0, int(total))
-        m = total // 60
-        s = total % 60
-        return f"{m:02d}:{s:02d}"
+        return _format_seconds(max(0, int(total)))
 
     def _update_pomodoro_display(self):
-        total = max(0, self.pomodoro_remaining)
-        m = total // 60
-        s = total % 60
-        text = f"{m:02d}:{s:02d}"
-        if hasattr(self, "pomodoro_canvas"):
-            self.pomodoro_canvas.itemconfig(self.pomodoro_time_text, text=text, fill=self.theme["fg"])
+        text = _format_seconds(max(0, self.pomodoro_remaining))
+        if text == self._last_display_text or not hasattr(self, "pomodoro_canvas"):
+            return
+        self._last_display_text = text
+        self.pomodoro_canvas.itemconfig(self.pomodoro_time_text, text=text)
 
     # ---------- Mood Prompt ----------
     def _show_mood_prompt(self):
-        today_key = date.today().strftime("%Y-%m-%d")
+        self._mood_today_key = date.today().isoformat()
+        if self._mood_overlay is None:
+            self._build_mood_overlay()
 
-        # 创建覆盖层（overlay），覆盖整个主窗口内容区域
-        overlay = tk.Frame(self, bg=self.theme["panel_bg"])
+        # 覆盖层（overlay）覆盖整个主窗口内容区域
+        overlay = self._mood_overlay
         overlay.place(relx=0, rely=0, relwidth=1, relheight=1)
         overlay.lift(aboveThis=None)
         try:
@@ -961,63 +1496,60 @@ class App(tk.Tk):
         except Exception:
             pass
 
+    def _build_mood_overlay(self):
+        overlay = tk.Frame(self, bg=self.theme["panel_bg"])
+        self._mood_overlay = overlay
+
         container = ttk.Frame(overlay)
         container.place(relx=0.5, rely=0.48, anchor="center")
 
-        ttk.Label(container, text="欢迎回家，今天的心情怎样？", font=("Microsoft YaHei", 14, "bold"))
-        ttk.Label(container, text="欢迎回家，今天的心情怎样？", font=("Microsoft YaHei", 14, "bold")).pack(pady=(8, 8))
+        ttk.Label(container, text="欢迎回家，今天的心情怎样？", font="AppH2").pack(pady=(8, 8))
 
         grid = ttk.Frame(container)
         grid.pack()
 
-        moods = MOODS
-
-        def animate_dismiss():
-            # 释放 grab 并向上滑动销毁 overlay
-            try:
-                overlay.grab_release()
-            except Exception:
-                pass
-
-            def step():
-                info = overlay.place_info()
-                rely = float(info.get("rely", 0))
-                rely -= 0.06
-                overlay.place_configure(rely=rely)
-                if rely > -1.2:
-                    overlay.after(12, step)
-                else:
-                    try:
-                        overlay.destroy()
-                    except Exception:
-                        pass
-
-            step()
-
-        def select_mood(mood_text: str):
-            _, emoji = _split_mood(mood_text)
-            self.storage.set_mood(today_key, emoji)
-            self._render_month()
-            animate_dismiss()
-
-        for i, mood in enumerate(moods):
+        for i, mood in enumerate(MOODS):
             # 在深色模式下将文字（和 emoji）设为白色；浅色模式不强制前景以保留彩色 emoji
-            btn_kwargs = {"width": 12, "relief": "raised", "bd": 0, "bg": self.theme["button_bg"], "command": (lambda m=mood: select_mood(m))}
+            btn_kwargs = {"width": 12, "relief": "raised", "bd": 0, "bg": self.theme["button_bg"]}
             if self.theme_name == "dark":
                 btn_kwargs["fg"] = self.theme["fg"]
-            b = tk.Button(grid, text=mood, **btn_kwargs)
-            b.grid(row=i // 8, column=i % 8, padx=6, pady=6, sticky="nsew")
+            b = tk.Button(grid, text=mood, command=partial(self._on_mood_click, mood), **btn_kwargs)
+            r, c = _MOOD_GRID_POS[i]
+            b.grid(row=r, column=c, padx=6, pady=6, sticky="nsew")
 
-        for r in range(4):
-            grid.grid_rowconfigure(r, weight=1)
-        for c in range(8):
-            grid.grid_columnconfigure(c, weight=1)
+        grid.grid_rowconfigure(tuple(range(_MOOD_GRID_ROWS)), weight=1)
+        grid.grid_columnconfigure(tuple(range(_MOOD_GRID_COLS)), weight=1)
 
         # 右下角灰色小“跳过”按钮
-        skip_btn = tk.Button(overlay, text="跳过", bg="#9E9E9E", fg="#FFFFFF", relief="flat", command=animate_dismiss)
+        skip_btn = tk.Button(overlay, text="跳过", bg="#9E9E9E", fg="#FFFFFF", relief="flat", command=self._dismiss_mood_overlay)
         skip_btn.place(relx=0.98, rely=0.94, anchor="se")
         skip_btn.lift()
 
+    def _on_mood_click(self, mood):
+        _, emoji = _split_mood(mood)
+        self.storage.set_mood(self._mood_today_key, emoji)
+        self._render_month()
+        self._dismiss_mood_overlay()
+
+    def _dismiss_mood_overlay(self):
+        # 释放 grab 并向上滑动隐藏 overlay
+        overlay = self._mood_overlay
+        try:
+            overlay.grab_release()
+        except Exception:
+            pass
+        t0 = time.monotonic()
+
+        def step():
+            rely = -MOOD_DISMISS_SPEED * (time.monotonic() - t0)
+            overlay.place_configure(rely=rely)
+            if rely > -1.2:
+                overlay.after(16, step)
+            else:
+                overlay.place_forget()
+
+        step()
+
     def _shift_month(self, delta):
         year = self.current_month.year + (self.current_month.month + delta - 1) // 12
         month = (self.current_month.month + delta - 1) % 12 + 1
@@ -1025,77 +1557,42 @@ class App(tk.Tk):
         self._render_month()
 
     def _render_month(self):
-        for child in self.month_frame.winfo_children():
-            child.destroy()
-
         self.month_label.configure(text=self.current_month.strftime("%Y年 %m月"))
 
-        headers = ["一", "二", "三", "四", "五", "六", "日"]
-        header_frame = ttk.Frame(self.month_frame)
-        header_frame.pack(fill="x")
-        for i, h in enumerate(headers):
-            ttk.Label(header_frame, text=h, width=12, anchor="center").grid(row=0, column=i, sticky="nsew")
-
-        cal = ttk.Frame(self.month_frame)
-        cal.pack(fill="both", expand=True)
-
-        first_weekday = (self.current_month.weekday() + 1) % 7  # Monday=0
-        days_in_month = (self._next_month(self.current_month) - timedelta(days=1)).day
-
-        total_slots = 42
-        start_offset = (first_weekday - 1) % 7
-
-        day_cursor = 1
-        for slot in range(total_slots):
-            row = slot // 7
-            col = slot % 7
-
-            cell = ttk.Frame(cal, relief="solid", borderwidth=1)
-            cell.grid(row=row, column=col, sticky="nsew", padx=2, pady=2)
-            cell.grid_propagate(False)
-
-            if slot < start_offset or day_cursor > days_in_month:
+        start_offset, days_in_month = calendar.monthrange(self.current_month.year, self.current_month.month)  # Monday=0
+        moods = self.storage.data.get("moods", {})
+        border = self.theme["month_date_border"]
+
+        for slot, widgets in enumerate(self._month_cells):
+            day = slot - start_offset + 1
+            if day < 1 or day > days_in_month:
+                self._month_slot_dates[slot] = None
+                if self._month_cell_state[slot] is not None:
+                    self._month_cell_state[slot] = None
+                    widgets["date_chip"].pack_forget()
                 continue
 
-            current = self.current_month.replace(day=day_cursor)
-            mood = self.storage.data.get("moods", {}).get(current.strftime("%Y-%m-%d"), "")
+            current = self.current_month.replace(day=day)
+            self._month_slot_dates[slot] = current
+            mood = moods.get(current.isoformat(), "")
             if mood:
                 mood_bg = MOOD_BAD_BG if mood in BAD_MOOD_EMOJIS else MOOD_GOOD_BG
             else:
                 mood_bg = self.theme["month_date_bg"]
-
-            date_chip = tk.Frame(
-                cell,
-                bg=mood_bg,
-                highlightbackground=self.theme["month_date_border"],
-                highlightthickness=1,
-            )
-            date_chip.pack(anchor="nw", padx=4, pady=4)
             mood_text = MOOD_LABELS.get(mood, "")
             mood_short = mood_text[:2] if mood_text else ""
-            label_text = f"{day_cursor} {mood}{mood_short}" if mood else str(day_cursor)
+            label_text = f"{day} {mood}{mood_short}" if mood else str(day)
             label_fg = "#1F3B57" if mood else self.theme["fg"]
-            label = tk.Label(date_chip, text=label_text, bg=mood_bg, fg=label_fg)
-            label.pack(padx=4, pady=1)
-
-            def _open_day(_event, target=current):
-                self._open_day_from_month(target)
-
-            cell.bind("<Button-1>", _open_day)
-            date_chip.bind("<Button-1>", _open_day)
-            label.bind("<Button-1>", _open_day)
-
-            day_cursor += 1
-
-        for i in range(7):
-            cal.grid_columnconfigure(i, weight=1, uniform="month")
-        for r in range(6):
-            cal.grid_rowconfigure(r, weight=1, uniform="month")
 
-    def _next_month(self, d: date):
-        if d.month == 12:
-            return date(d.year + 1, 1, 1)
-        return date(d.year, d.month + 1, 1)
+            state = (label_text, mood_bg, label_fg, border)
+            previous = self._month_cell_state[slot]
+            if state == previous:
+                continue
+            self._month_cell_state[slot] = state
+            widgets["date_chip"].configure(bg=mood_bg, highlightbackground=border)
+            widgets["day_label"].configure(text=label_text, bg=mood_bg, fg=label_fg)
+            if previous is None:
+                widgets["date_chip"].pack(anchor="nw", padx=4, pady=4)
 
     # ---------- Archive Tab ----------
     def _build_archive_tab(self):
@@ -1127,9 +1624,13 @@ class App(tk.Tk):
         self.archive_list.column("summary", width=640, anchor="w")
         self.archive_list.pack(in_=list_wrap, side="left", fill="both", expand=True)
 
-        archive_scroll = ttk.Scrollbar(list_wrap, orient="vertical", command=self.archive_list.yview)
-        archive_scroll.pack(side="left", fill="y")
-        self.archive_list.configure(yscrollcommand=archive_scroll.set)
+        self.archive_scroll = ttk.Scrollbar(list_wrap, orient="vertical", command=self.archive_list.yview)
+        self.archive_scroll.pack(side="left", fill="y")
+        self.archive_list.configure(yscrollcommand=self._on_archive_scroll)
+        self._archive_pending = []
+        self._archive_loaded = 0
+        self._last_archive_state = None
+        self._configure_archive_tags()
         self.archive_list.bind("<Button-1>", self._toggle_archive_selection, add=True)
         self.archive_list.bind("<Double-1>", self._open_archive_detail, add=True)
 
@@ -1145,6 +1646,7 @@ class App(tk.Tk):
             direction="down",
             command=lambda: self.archive_list.yview_scroll(3, "units"),
         ).pack(side="left", padx=6)
+        self._refresh_archive()
 
     # ---------- Event CRUD ----------
     def _open_add_event(self):
@@ -1190,7 +1692,7 @@ class App(tk.Tk):
         ttk.Entry(inner, textvariable=title_var).pack(fill="x", padx=12)
 
         ttk.Label(inner, text="日期").pack(anchor="w", padx=12, pady=(10, 2))
-        date_var = tk.StringVar(value=event["date"] if event else self.selected_day.strftime("%Y-%m-%d"))
+        date_var = tk.StringVar(value=event["date"] if event else self.selected_day.isoformat())
         ttk.Entry(inner, textvariable=date_var).pack(fill="x", padx=12)
 
         ttk.Label(inner, text="开始时间").pack(anchor="w", padx=12, pady=(10, 2))
@@ -1219,7 +1721,7 @@ class App(tk.Tk):
 
         def on_save():
             try:
-                datetime.strptime(date_var.get(), "%Y-%m-%d")
+                _parse_date(date_var.get())
                 self._validate_time(self._merge_time(start_hour_var, start_min_var))
                 self._validate_time(self._merge_time(end_hour_var, end_min_var))
             except ValueError:
@@ -1267,7 +1769,7 @@ class App(tk.Tk):
         inner = self._create_scrollable_dialog(dialog)
 
         ttk.Label(inner, text="日期").pack(anchor="w", padx=12, pady=(12, 2))
-        date_var = tk.StringVar(value=date.today().strftime("%Y-%m-%d"))
+        date_var = tk.StringVar(value=date.today().isoformat())
         ttk.Entry(inner, textvariable=date_var).pack(fill="x", padx=12)
 
         ttk.Label(inner, text="类型").pack(anchor="w", padx=12, pady=(10, 2))
@@ -1292,7 +1794,7 @@ class App(tk.Tk):
 
         def on_save():
             try:
-                datetime.strptime(date_var.get(), "%Y-%m-%d")
+                _parse_date(date_var.get())
             except ValueError:
                 messagebox.showerror("错误", "日期格式不正确")
                 return
@@ -1324,22 +1826,31 @@ class App(tk.Tk):
         inner = ttk.Frame(canvas)
         canvas.create_window((0, 0), window=inner, anchor="nw")
 
-        def _on_configure(_event):
-            canvas.configure(scrollregion=canvas.bbox("all"))
+        scrollregion_pending = [False]
 
-        inner.bind("<Configure>", _on_configure)
+        def _update_scrollregion():
+            scrollregion_pending[0] = False
+            canvas.configure(scrollregion=canvas.bbox("all"))
 
-        def _bind_mousewheel(_event):
-            canvas.bind_all("<MouseWheel>", _on_mousewheel)
+        def _on_configure(_event):
+            # coalesce bursts of <Configure> during a resize into one bbox walk
+            if not scrollregion_pending[0]:
+                scrollregion_pending[0] = True
+                canvas.after_idle(_update_scrollregion)
 
-        def _unbind_mousewheel(_event):
-            canvas.unbind_all("<MouseWheel>")
+        inner.bind("<Configure>", _on_configure)
 
         def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+            if not event.delta:
+                return
+            # truncate toward zero so both directions behave alike; small trackpad deltas still move one unit
+            step = int(event.delta / MOUSEWHEEL_DELTA) or (1 if event.delta > 0 else -1)
+            canvas.yview_scroll(-step, "units")
 
-        canvas.bind("<Enter>", _bind_mousewheel)
-        canvas.bind("<Leave>", _unbind_mousewheel)
+        # the dialog toplevel is in every child's bindtags, so one binding covers its contents
+        dialog.bind("<MouseWheel>", _on_mousewheel, add="+")
+        dialog.bind("<Button-4>", lambda _e: canvas.yview_scroll(-1, "units"), add="+")
+        dialog.bind("<Button-5>", lambda _e: canvas.yview_scroll(1, "units"), add="+")
 
         return inner
 
@@ -1405,12 +1916,9 @@ class App(tk.Tk):
             if not media:
                 messagebox.showinfo("提示", "该收藏没有媒体文件")
                 return
-            missing = []
-            for path in media:
-                if os.path.exists(path):
-                    os.startfile(path)
-                else:
-                    missing.append(path)
+            existing, missing = _split_existing(media)
+            for path in existing:
+                self._io_pool.submit(os.startfile, path)
             if missing:
                 messagebox.showwarning("提示", "部分媒体文件不存在或已移动")
 
@@ -1420,7 +1928,7 @@ class App(tk.Tk):
                 return
             path = media_list.get(selection[0])
             if os.path.exists(path):
-                os.startfile(path)
+                self._io_pool.submit(os.startfile, path)
             else:
                 messagebox.showwarning("提示", "媒体文件不存在或已移动")
 
@@ -1434,93 +1942,56 @@ class App(tk.Tk):
         self._render_month()
         if hasattr(self, "stats_canvas"):
             self._render_stats()
-        self._refresh_archive()
+        if hasattr(self, "archive_list"):
+            self._refresh_archive()
 
     def _refresh_archive(self):
-        for item in self.archive_list.get_children():
-            self.archive_list.delete(item)
         selected = self.archive_filter.get()
-        items = self.storage.data["archives"]
-        if selected and selected != "全部":
-            items = [a for a in items if a["category"] == selected]
-        items = sorted(items, key=lambda x: x["date"], reverse=True)
-        for index, item in enumerate(items):
-            title = item["text"].strip().replace("\n", " ")[:40] or "（无文字）"
-            tag = "even" if index % 2 == 0 else "odd"
-            self.archive_list.insert(
-                "",
-                "end",
-                iid=item["id"],
-                values=(item["date"], title),
-                tags=(tag,),
-            )
+        items = self.storage.archives_desc(selected if selected and selected != "全部" else None)
+        state = (selected, tuple(a["id"] for a in items))
+        if state == self._last_archive_state:
+            return
+        self._last_archive_state = state
+        self.archive_list.delete(*self.archive_list.get_children())
+        self._archive_pending = items
+        self._archive_loaded = 0
+        self._load_more_archive()
+
+    def _configure_archive_tags(self):
         self.archive_list.tag_configure("even", background=self.theme["tree_alt"])
         self.archive_list.tag_configure("odd", background=self.theme["list_bg"])
 
+    def _load_more_archive(self):
+        start = self._archive_loaded
+        chunk = self._archive_pending[start:start + ARCHIVE_CHUNK_SIZE]
+        rows = [
+            (
+                item["id"],
+                (item["date"], item["text"].strip().translate(ARCHIVE_TITLE_TABLE)[:40] or "（无文字）"),
+                ("even",) if index % 2 == 0 else ("odd",),
+            )
+            for index, item in enumerate(chunk, start)
+        ]
+        insert = self.archive_list.insert
+        for iid, values, tags in rows:
+            insert("", "end", iid=iid, values=values, tags=tags)
+        self._archive_loaded = start + len(chunk)
+
+    def _on_archive_scroll(self, first, last):
+        self.archive_scroll.set(first, last)
+        if float(last) >= 0.9 and self._archive_loaded < len(self._archive_pending):
+            self.after_idle(self._load_more_archive)
+
     def _apply_theme(self):
+        if self._applied_theme_name == self.theme_name:
+            return
+        self._applied_theme_name = self.theme_name
+        self._apply_ttk_styles()
+        self._invalidate_rendered_views()
+
+    def _apply_ttk_styles(self):
         self.configure(bg=self.theme["app_bg"])
-        self.style.configure("TFrame", background=self.theme["app_bg"])
-        self.style.configure("TLabel", background=self.theme["app_bg"], foreground=self.theme["fg"])
-        self.style.configure(
-            "TButton",
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-        )
-        self.style.map(
-            "TButton",
-            background=[("active", self.theme["button_bg_active"]), ("pressed", self.theme["button_bg_pressed"])],
-        )
-        self.style.configure(
-            "Mini.TButton",
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-        )
-        self.style.map(
-            "Mini.TButton",
-            background=[("active", self.theme["button_bg_active"]), ("pressed", self.theme["button_bg_pressed"])],
-        )
-        self.style.configure(
-            "Weekday.TButton",
-            font=WEEKDAY_FANCY_FONT,
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-        )
-        self.style.map(
-            "Weekday.TButton",
-            background=[("active", self.theme["button_bg_active"]), ("pressed", self.theme["button_bg_pressed"])],
-        )
-        self.style.configure("TNotebook", background=self.theme["app_bg"])
-        self.style.configure(
-            "TNotebook.Tab",
-            background=self.theme["tab_bg"],
-            foreground=self.theme["fg"],
-        )
-        self.style.map(
-            "TNotebook.Tab",
-            background=[("selected", self.theme["tab_bg_selected"]), ("active", self.theme["tab_bg_active"])],
-            foreground=[("selected", self.theme["fg"]), ("active", self.theme["fg"]), ("!disabled", self.theme["fg"])],
-        )
-        self.style.configure(
-            "Vertical.TScrollbar",
-            troughcolor=self.theme["scroll_trough"],
-            background=self.theme["scroll_thumb"],
-            bordercolor=self.theme["scroll_trough"],
-            lightcolor=self.theme["scroll_thumb"],
-            darkcolor=self.theme["scroll_thumb"],
-            relief="flat",
-        )
-        self.style.configure(
-            "Archive.Treeview",
-            background=self.theme["list_bg"],
-            fieldbackground=self.theme["list_bg"],
-            foreground=self.theme["fg"],
-        )
-        self.style.configure(
-            "Archive.Treeview.Heading",
-            background=self.theme["button_bg"],
-            foreground=self.theme["fg"],
-        )
-        self.style.configure("Status.TFrame", background=self.theme["panel_bg"])
+        self._apply_styles()
 
         if hasattr(self, "day_list"):
             self.day_list.configure(bg=self.theme["list_bg"], fg=self.theme["fg"])
@@ -1529,22 +2000,39 @@ class App(tk.Tk):
         if hasattr(self, "pomodoro_canvas"):
             self.pomodoro_canvas.configure(bg=self.theme["canvas_bg"])
             self._draw_pomodoro_ring()
-            self._update_pomodoro_display()
+            self.pomodoro_canvas.itemconfig(self.pomodoro_time_text, fill=self.theme["fg"])
         if hasattr(self, "pomodoro_preset_canvases"):
-            for canvas, label in self.pomodoro_preset_canvases:
+            for canvas, oval_id, text_id in self.pomodoro_preset_canvases:
                 canvas.configure(bg=self.theme["app_bg"])
-                canvas.delete("all")
-                canvas.create_oval(8, 8, 90 - 8, 90 - 8, fill=self.theme["canvas_bg"], outline=self.theme["button_bg"], width=2)
-                canvas.create_text(90 / 2, 90 / 2, text=label, fill=self.theme["fg"], font=("Microsoft YaHei", 12, "bold"))
+                canvas.itemconfig(oval_id, fill=self.theme["canvas_bg"], outline=self.theme["button_bg"])
+                canvas.itemconfig(text_id, fill=self.theme["fg"])
         if hasattr(self, "status_bar"):
             self.status_bar.configure(style="Status.TFrame")
         if hasattr(self, "theme_toggle_btn"):
             self._update_theme_button_text()
 
+    def _invalidate_rendered_views(self):
         self._render_week_grid()
         self._render_month()
-        self._render_stats()
-        self._refresh_archive()
+        if hasattr(self, "stats_canvas"):
+            self._render_stats()
+        if hasattr(self, "archive_list"):
+            self._configure_archive_tags()
+
+    def _apply_styles(self):
+        configs, maps = _build_styles(self.theme_name)
+        last_cfg = self._last_theme_cfg
+        for name, kw in configs:
+            prev = last_cfg.get(name, {})
+            changed = {k: v for k, v in kw.items() if prev.get(k) != v}
+            if changed:
+                self.style.configure(name, **changed)
+            last_cfg[name] = kw
+        last_maps = self._last_theme_maps
+        for name, kw in maps:
+            if last_maps.get(name) != kw:
+                self.style.map(name, **kw)
+                last_maps[name] = kw
 
     def _update_theme_button_text(self):
         if self.theme_name == "dark":
@@ -1563,28 +2051,45 @@ class App(tk.Tk):
 
     def _schedule_theme_check(self):
         auto_name = self._auto_theme_name()
-        if auto_name != self.theme_name:
+        if auto_name != self._last_auto_theme:
+            self._last_auto_theme = auto_name
             self.theme_name = auto_name
             self.theme = THEMES[self.theme_name]
             self._apply_theme()
-        self.after(10 * 60 * 1000, self._schedule_theme_check)
+        now = datetime.now()
+        if now.hour < 6:
+            boundary = now.replace(hour=6, minute=0, second=0, microsecond=0)
+        elif now.hour < 23:
+            boundary = now.replace(hour=23, minute=0, second=0, microsecond=0)
+        else:
+            boundary = (now + timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
+        # one extra second so the next check lands past the boundary
+        delay_ms = int((boundary - now).total_seconds() * 1000) + 1000
+        self.after(delay_ms, self._schedule_theme_check)
 
     def _select_day(self, d: date):
         self.selected_day = d
-        self.day_label.config(text=d.strftime("%Y-%m-%d"))
-        self.day_list.delete(0, tk.END)
-        self.day_list_ids = []
-        for event in self._events_on_day(d):
-            self.day_list_ids.append(event["id"])
+        self.day_label.config(text=d.isoformat())
+        events = self._events_on_day(d)
+        self.day_list_ids = [event["id"] for event in events]
+        lines = []
+        for event in events:
             notes = event.get("notes", "").strip()
-            display = f"{event['title']}（{notes}）" if notes else event["title"]
-            self.day_list.insert(tk.END, display)
+            lines.append(f"{event['title']}（{notes}）" if notes else event["title"])
+        if lines == self._day_list_lines:
+            # same rows as shown; only drop the selection a rebuild would have cleared
+            self.day_list.selection_clear(0, tk.END)
+            return
+        self._day_list_lines = lines
+        self.day_list.delete(0, tk.END)
+        if lines:
+            self.day_list.insert(tk.END, *lines)
 
     def _select_event_by_id(self, event_id: str):
         ev = self._get_event_by_id(event_id)
         if not ev:
             return
-        d = datetime.strptime(ev["date"], "%Y-%m-%d").date()
+        d = date.fromisoformat(ev["date"])
         self._select_day(d)
         for i, eid in enumerate(self.day_list_ids):
             if eid == event_id:
@@ -1604,7 +2109,7 @@ class App(tk.Tk):
         self._select_day(d)
 
         dialog = tk.Toplevel(self)
-        dialog.title(f"{d.strftime('%Y-%m-%d')} 日程详情")
+        dialog.title(f"{d.isoformat()} 日程详情")
         dialog.geometry("760x620")
         dialog.transient(self)
         dialog.grab_set()
@@ -1613,8 +2118,8 @@ class App(tk.Tk):
 
         inner = self._create_scrollable_dialog(dialog)
 
-        header_text = f"{d.strftime('%Y-%m-%d')} 全部日程"
-        ttk.Label(inner, text=header_text, font=("Microsoft YaHei", 14, "bold")).pack(anchor="w", padx=12, pady=(12, 8))
+        header_text = f"{d.isoformat()} 全部日程"
+        ttk.Label(inner, text=header_text, font="AppH2").pack(anchor="w", padx=12, pady=(12, 8))
 
         events = self._events_on_day(d)
         if not events:
@@ -1636,7 +2141,7 @@ class App(tk.Tk):
                 text=title,
                 bg=self.theme["panel_bg"],
                 fg=self.theme["fg"],
-                font=("Microsoft YaHei", 12, "bold"),
+                font="AppMedium",
                 anchor="w",
                 justify="left",
             ).pack(fill="x", padx=10, pady=(8, 4))
@@ -1670,37 +2175,28 @@ class App(tk.Tk):
                 ).pack(fill="x", padx=10, pady=(0, 8))
 
     def _events_on_day(self, d: date):
-        return sorted(
-            [e for e in self.storage.data["events"] if e["date"] == d.strftime("%Y-%m-%d")],
-            key=lambda x: x["start"],
-        )
+        return list(self.storage.events_on_day(d.toordinal()))
 
     def _events_in_week(self, start: date):
-        end = start + timedelta(days=6)
-        return [
-            e for e in self.storage.data["events"]
-            if start <= datetime.strptime(e["date"], "%Y-%m-%d").date() <= end
-        ]
+        start_ord = start.toordinal()
+        return self.storage.events_for_range(start_ord, start_ord + 6)
 
     def _get_event_by_id(self, event_id: str):
-        for e in self.storage.data["events"]:
-            if e["id"] == event_id:
-                return e
-        return None
+        return self.storage.get_event(event_id)
 
     def _week_start(self, d: date):
-        return d - timedelta(days=d.weekday())
+        return _week_start(d)
 
     def _week_range_text(self, start: date):
-        end = start + timedelta(days=6)
-        return f"{start.strftime('%Y/%m/%d')} - {end.strftime('%Y/%m/%d')}"
+        return _week_range_text(start)
 
     def _to_minutes(self, time_str: str):
-        h, m = map(int, time_str.split(":"))
-        return h * 60 + m
+        return _parse_hm_padded(time_str)
 
     def _validate_time(self, time_str: str):
-        datetime.strptime(time_str, "%H:%M")
+        m = _TIME_RE.match(time_str)
+        if not m or int(m[1]) > 23 or int(m[2]) > 59:
+            raise ValueError(f"invalid time: {time_str!r}")
 
     def _build_time_picker(self, parent, time_value: str):
         hours = [f"{h:02d}" for h in range(6, 23)]
@@ -1727,15 +2223,18 @@ class App(tk.Tk):
 
     def _flash_day_highlight(self, d: date):
         self.highlight_day = d
-
-        def _set(state):
-            self.highlight_active = state
-            self._update_day_highlight()
-
-        _set(True)
-        self.after(500, lambda: _set(False))
-        self.after(1000, lambda: _set(True))
-        self.after(1500, lambda: _set(False))
+        if self._flash_after_id is not None:
+            self.after_cancel(self._flash_after_id)
+        self._flash_phase = 3
+        self.highlight_active = True
+        self._update_day_highlight()
+        self._flash_after_id = self.after(500, self._flash_step)
+
+    def _flash_step(self):
+        self._flash_phase -= 1
+        self.highlight_active = not self.highlight_active
+        self._update_day_highlight()
+        self._flash_after_id = self.after(500, self._flash_step) if self._flash_phase > 0 else None
 
     def _create_triangle_button(self, parent, direction: str, command):
         size = 24
@@ -1756,20 +2255,32 @@ class App(tk.Tk):
     def _update_day_highlight(self):
         if not getattr(self, "week_col_rects", None):
             return
+        lit = -1
+        if self.highlight_active and self.highlight_day:
+            lit = (self.highlight_day - self.week_start).days
+            if not 0 <= lit < 7:
+                lit = -1
+        if self._week_fill_theme != self.theme_name:
+            # a new theme recolors every column; otherwise only the old and new lit columns change
+            self._week_fill_theme = self.theme_name
+            changed = range(7)
+        elif lit == self._week_lit_col:
+            return
+        else:
+            changed = [i for i in (self._week_lit_col, lit) if i >= 0]
+        self._week_lit_col = lit
         highlight_color = self.theme["highlight"]
         normal_color = self.theme["canvas_bg"]
-        for i, rect_id in enumerate(self.week_col_rects):
-            fill = normal_color
-            if self.highlight_active and self.highlight_day:
-                if self.week_start <= self.highlight_day <= self.week_start + timedelta(days=6):
-                    if i == (self.highlight_day - self.week_start).days:
-                        fill = highlight_color
-            if self.week_grid:
-                self.week_grid.itemconfig(rect_id, fill=fill)
+        for i in changed:
+            self.week_grid.itemconfig(self.week_col_rects[i], fill=highlight_color if i == lit else normal_color)
 
     def _create_rounded_rect(self, canvas, x1, y1, x2, y2, radius, fill, outline):
+        points = self._rounded_rect_points(x1, y1, x2, y2, radius)
+        return canvas.create_polygon(points, smooth=True, fill=fill, outline=outline)
+
+    def _rounded_rect_points(self, x1, y1, x2, y2, radius):
         radius = min(radius, abs(x2 - x1) / 2, abs(y2 - y1) / 2)
-        points = [
+        return [
             x1 + radius, y1,
             x2 - radius, y1,
             x2, y1,
@@ -1783,7 +2294,6 @@ class App(tk.Tk):
             x1, y1 + radius,
             x1, y1,
         ]
-        return canvas.create_polygon(points, smooth=True, fill=fill, outline=outline)
 
     def _toggle_archive_selection(self, event):
         row = self.archive_list.identify_row(event.y)
@@ -1797,83 +2307,18 @@ class App(tk.Tk):
     def _layout_day_events(self, events):
         if not events:
             return []
-        items = []
-        for ev in events:
-            start = self._to_minutes(ev["start"])
-            end = self._to_minutes(ev["end"])
-            items.append({"event": ev, "start": start, "end": end})
-        items.sort(key=lambda x: (x["start"], x["end"]))
-
-        active = []
-        columns = []
-        layouts = []
-        cluster = []
-        cluster_max_cols = 0
-
-        def finalize_cluster():
-            if not cluster:
-                return
-            for entry in cluster:
-                entry["cols"] = cluster_max_cols
-                layouts.append(entry)
-
-        for item in items:
-            current_start = item["start"]
-            active = [a for a in active if a["end"] > current_start]
-            if not active:
-                finalize_cluster()
-                cluster = []
-                cluster_max_cols = 0
-                columns = []
-
-            used = {a["col"] for a in active}
-            col = 0
-            while col in used:
-                col += 1
-
-            entry = {"event": item["event"], "start": item["start"], "end": item["end"], "col": col, "cols": 1}
-            active.append(entry)
-            cluster.append(entry)
-            cluster_max_cols = max(cluster_max_cols, col + 1)
-
-        finalize_cluster()
-        return layouts
+        starts = [ev["_sm"] for ev in events]
+        ends = [ev["_em"] for ev in events]
+        order, cols, widths = _layout_columns(starts, ends)
+        return [
+            {"event": events[i], "start": starts[i], "end": ends[i], "col": cols[i], "cols": widths[i]}
+            for i in order
+        ]
 
     def _find_overlaps(self, date_str: str, start: str, end: str, exclude_id=None):
-        start_min = self._to_minutes(start)
-        end_min = self._to_minutes(end)
-        overlaps = []
-        for e in self.storage.data["events"]:
-            if e["date"] != date_str:
-                continue
-            if exclude_id and e["id"] == exclude_id:
-                continue
-            e_start = self._to_minutes(e["start"])
-            e_end = self._to_minutes(e["end"])
-            if max(start_min, e_start) < min(end_min, e_end):
-                overlaps.append(e)
-        return overlaps
-
-    def _create_rounded_event_tag(self, parent, text: str, color: str):
-        canvas = tk.Canvas(parent, height=24, bg=self.theme["app_bg"], highlightthickness=0)
-        canvas.pack(fill="x", pady=2)
-
-        def _draw(_event=None):
-            canvas.delete("all")
-            width = max(canvas.winfo_width(), 80)
-            height = 22
-            radius = 8
-            x1, y1, x2, y2 = 2, 2, width - 2, height
-            canvas.create_oval(x1, y1, x1 + radius * 2, y1 + radius * 2, fill=color, outline="")
-            canvas.create_oval(x2 - radius * 2, y1, x2, y1 + radius * 2, fill=color, outline="")
-            canvas.create_oval(x1, y2 - radius * 2, x1 + radius * 2, y2, fill=color, outline="")
-            canvas.create_oval(x2 - radius * 2, y2 - radius * 2, x2, y2, fill=color, outline="")
-            canvas.create_rectangle(x1 + radius, y1, x2 - radius, y2, fill=color, outline="")
-            canvas.create_rectangle(x1, y1 + radius, x2, y2 - radius, fill=color, outline="")
-            canvas.create_text(10, height / 2, anchor="w", text=text, fill="#000000")
-
-        canvas.bind("<Configure>", _draw)
-        _draw()
+        day_ord = date.fromisoformat(date_str).toordinal()
+        overlaps = self.storage.events_overlapping(day_ord, self._to_minutes(start), self._to_minutes(end))
+        return [e for e in overlaps if not exclude_id or e["id"] != exclude_id]
 
 
 if __name__ == "__main__":
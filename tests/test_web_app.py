@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("supabase")
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web_app.py")
+
+
+def _logged_in_app(tmp_path, page):
+    # run a copy so DATA_DIR (next to the script) points into tmp_path
+    app_file = tmp_path / "web_app.py"
+    shutil.copy(APP, app_file)
+    at = AppTest.from_file(str(app_file), default_timeout=30)
+    # no Supabase credentials: the app stores data in local files
+    at.secrets["ADMIN_CODE"] = "test"
+    at.session_state["user"] = "tester"
+    at.session_state["mood_skipped"] = True
+    at.session_state["page"] = page
+    return at
+
+
+def _read_user_data(tmp_path):
+    with open(tmp_path / "data" / "users" / "tester.json", encoding="utf-8") as f:
+        data = json.load(f)
+    log_path = tmp_path / "data" / "users" / "tester.json.log"
+    if log_path.exists():
+        for line in log_path.read_text(encoding="utf-8").splitlines():
+            rec = json.loads(line)
+            assert "op" in rec
+    return data
+
+
+def test_word_book_saved_from_button_callback_reaches_disk(tmp_path):
+    at = _logged_in_app(tmp_path, "单词学习")
+    at.run()
+    assert not at.exception
+
+    at.text_input(key="word_input").set_value("apple")
+    at.text_input(key="meaning_input").set_value("苹果")
+    at.button(key="add_word").click().run()
+    at.button(key="save_word_book").click().run()
+    assert not at.exception
+
+    books = _read_user_data(tmp_path)["word_books"]
+    assert [item["word"] for items in books.values() for item in items] == ["apple"]
+
+
+def test_log_line_without_op_is_ignored_on_load(tmp_path):
+    at = _logged_in_app(tmp_path, "心情")
+    at.run()
+    assert not at.exception
+    user_file = tmp_path / "data" / "users" / "tester.json"
+    with open(str(user_file) + ".log", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "set_mood", "date": "2024-01-01", "emoji": "😄"}) + "\n")
+        f.write(json.dumps({"moods": {}}) + "\n")
+        f.write(json.dumps({"op": "set_mood", "date": "2024-01-02", "emoji": "😄"}) + "\n")
+
+    at = _logged_in_app(tmp_path, "心情")
+    at.run()
+    assert not at.exception
+    moods = at.session_state["loaded_data"][1]["moods"]
+    assert moods == {"2024-01-01": "😄"}
@@ -3,20 +3,37 @@ try:
     from streamlit_autorefresh import st_autorefresh
 except Exception:
     st_autorefresh = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+import bisect
 import json
 import os
+import secrets
 import uuid
 import time
 import math
 import hashlib
+import hmac
+import html
+import numpy as np
 from datetime import datetime, date, timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 import plotly.graph_objects as go
+import streamlit.components.v1 as components
 from supabase import create_client, Client
 
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
+# stored hashes carry no iteration count, so changing this invalidates existing passwords
+PBKDF2_ITERATIONS = 100000
+USER_LOG_SUFFIX = ".log"
+# the log is folded into the snapshot once it passes this share of the snapshot's size
+USER_LOG_MAX_FRACTION = 8
+USER_LOG_MIN_BYTES = 4096
 USER_DATA_DIR = os.path.join(DATA_DIR, "users")
 
 DEFAULT_DATA = {
@@ -24,6 +41,7 @@ DEFAULT_DATA = {
     "archives": [],
     "moods": {},
     "pomodoro_records": [],
+    "pomodoro_total_seconds": 0,
     "pomodoro_state": {"running": False, "start": None, "duration": 0},
     "word_books": {},
     "habits": [],
@@ -31,7 +49,7 @@ DEFAULT_DATA = {
     "forum_comments": [],
 }
 
-CATEGORIES = ["生活", "学习", "班团事务", "运动", "其他"]
+CATEGORIES = ("生活", "学习", "班团事务", "运动", "其他")
 CATEGORY_COLORS = {
     "生活": "#CFE8FF",
     "学习": "#DFF2D8",
@@ -39,11 +57,16 @@ CATEGORY_COLORS = {
     "运动": "#D9F5D6",
     "其他": "#E8E0FF",
 }
+CATEGORY_COLOR_LIST = tuple(CATEGORY_COLORS[c] for c in CATEGORIES)
+EVENT_BLOCK_STYLES = {c: f"background:{v}; border-color:{v};" for c, v in CATEGORY_COLORS.items()}
 
 WEEKDAY_SHORT_EN = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 WEEKDAY_CN = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+MONTH_WEEKDAY_HEADER = "".join(
+    f"<div class='month-weekday'>{h}</div>" for h in ("一", "二", "三", "四", "五", "六", "日")
+)
 
-MOODS = [
+MOODS = (
     "开心 😄", "平静 😌", "感恩 🙏", "充满希望 🌈",
     "自豪 😎", "期待 🤩", "专注 🔍", "高效 ⚡",
     "动力十足 🔥", "创造 💡", "学习 📚", "挑战 🧗",
@@ -52,7 +75,7 @@ MOODS = [
     "压力大 😰", "无聊 😐",
     "混乱 😵", "犹豫 🤔", "拖延 🐌", "孤独 🏝️",
     "想念 🌙", "生气 😠", "失望 😔", "焦虑 😟",
-]
+)
 
 BAD_MOOD_TEXTS = {"压力大", "混乱", "犹豫", "拖延", "孤独", "想念", "生气", "失望", "焦虑"}
 
@@ -77,55 +100,184 @@ MOOD_GOOD_BG = "#E7F7E8"
 MOOD_BAD_BG = "#FBE7E7"
 
 
+def event_sort_key(ev: dict):
+    return ev["date"], ev["start"]
+
+
+def archive_sort_key(item: dict):
+    return item["date"]
+
+
+def backfill_event_minutes(events: list):
+    # events saved before start_min/end_min existed get them filled in once at load
+    for ev in events:
+        if "start_min" not in ev:
+            ev["start_min"] = to_minutes(ev["start"])
+            ev["end_min"] = to_minutes(ev["end"])
+
+
+def events_between(events: list, first_day: str, last_day: str) -> list:
+    # events are kept in (date, start) order, so a date range is one contiguous slice
+    lo = bisect.bisect_left(events, first_day, key=lambda ev: ev["date"])
+    hi = bisect.bisect_right(events, last_day, lo=lo, key=lambda ev: ev["date"])
+    return events[lo:hi]
+
+
 def ensure_data_file(file_path: str):
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     if not os.path.exists(file_path):
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(DEFAULT_DATA, f, ensure_ascii=False, indent=2)
+        _write_atomic(file_path, _json_dumps(DEFAULT_DATA))
 
 
-def load_data(file_path: str):
-    ensure_data_file(file_path)
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def _json_dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _json_line(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_atomic(path: str, payload: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _file_stamp(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# stamps only key the cache; any save produces a fresh entry
+@st.cache_data(show_spinner=False, max_entries=32)
+def _load_data_cached(file_path: str, snapshot_stamp: tuple, log_stamp: tuple | None):
+    with open(file_path, "rb") as f:
+        data = _json_loads(f.read())
     data.setdefault("events", [])
     data.setdefault("archives", [])
     data.setdefault("moods", {})
     data.setdefault("pomodoro_records", [])
+    if "pomodoro_total_seconds" not in data:
+        data["pomodoro_total_seconds"] = sum(r.get("seconds", 0) for r in data["pomodoro_records"])
     data.setdefault("pomodoro_state", {"running": False, "start": None, "duration": 0})
     data.setdefault("word_books", {})
     data.setdefault("habits", [])
     data.setdefault("forum_posts", [])
     data.setdefault("forum_comments", [])
+    if log_stamp is not None:
+        # each log line is one operation saved since the snapshot
+        with open(file_path + USER_LOG_SUFFIX, "rb") as f:
+            for line in f:
+                try:
+                    rec = _json_loads(line)
+                except ValueError:
+                    rec = None
+                if not isinstance(rec, dict) or "op" not in rec:
+                    # torn tail from an interrupted append; the next snapshot drops it
+                    break
+                apply_data_op(data, rec)
+    # kept in (date, start) order so views can iterate without re-sorting
+    data["events"].sort(key=event_sort_key)
+    backfill_event_minutes(data["events"])
+    data["archives"].sort(key=archive_sort_key)
+    return data
+
+
+def apply_data_op(data: dict, rec: dict):
+    op = rec["op"]
+    if op == "put_event":
+        ev = rec["event"]
+        events = data["events"]
+        for i, old in enumerate(events):
+            if old["id"] == ev["id"]:
+                events[i] = ev
+                break
+        else:
+            events.append(ev)
+    elif op == "delete_event":
+        data["events"] = [e for e in data["events"] if e["id"] != rec["id"]]
+    elif op == "set_mood":
+        data["moods"][rec["date"]] = rec["emoji"]
+    elif op == "add_archive":
+        data["archives"].append(rec["archive"])
+    elif op == "delete_archive":
+        data["archives"] = [a for a in data["archives"] if a["id"] != rec["id"]]
+    elif op == "add_pomodoro_record":
+        data["pomodoro_records"].append(rec["record"])
+        data["pomodoro_total_seconds"] += rec["record"].get("seconds", 0)
+    elif op == "delete_pomodoro_record":
+        removed = data["pomodoro_records"].pop(rec["index"])
+        data["pomodoro_total_seconds"] -= removed.get("seconds", 0)
+    elif op == "set_pomodoro_state":
+        data["pomodoro_state"] = rec["state"]
+
+
+def load_data(file_path: str):
+    ensure_data_file(file_path)
+    key = (file_path, _file_stamp(file_path), _file_stamp(file_path + USER_LOG_SUFFIX))
+    # the session keeps its own dict until the file changes, skipping cache_data's per-run copy
+    loaded = st.session_state.get("loaded_data")
+    if loaded is not None and loaded[0] == key:
+        return loaded[1]
+    data = _load_data_cached(*key)
+    st.session_state.loaded_data = (key, data)
     return data
 
 
 def save_data(data, file_path: str):
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    _write_atomic(file_path, _json_dumps(data))
+    if os.path.exists(file_path + USER_LOG_SUFFIX):
+        os.remove(file_path + USER_LOG_SUFFIX)
+
+
+def append_data_log(file_path: str, record: bytes):
+    with open(file_path + USER_LOG_SUFFIX, "ab") as f:
+        f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_users_cached(stamp: tuple):
+    with open(USERS_FILE, "rb") as f:
+        return _json_loads(f.read())
 
 
 def load_users():
     os.makedirs(DATA_DIR, exist_ok=True)
     if not os.path.exists(USERS_FILE):
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f, ensure_ascii=False, indent=2)
-    with open(USERS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+        save_users({})
+    # cache_data hands back a copy, so callers may edit the dict before save_users
+    return _load_users_cached(_file_stamp(USERS_FILE))
 
 
 def save_users(users: dict):
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+    _write_atomic(USERS_FILE, _json_dumps(users))
 
 
 def hash_password(password: str, salt: str) -> str:
-    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), 100000)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), PBKDF2_ITERATIONS)
     return digest.hex()
 
 
 def verify_password(password: str, salt: str, stored_hash: str) -> bool:
-    return hash_password(password, salt) == stored_hash
+    return hmac.compare_digest(hash_password(password, salt), stored_hash)
 
 
 def get_supabase_client() -> Client | None:
@@ -238,23 +390,29 @@ def db_load_user_data(user_id: str):
     data.setdefault("archives", [])
     data.setdefault("moods", {})
     data.setdefault("pomodoro_records", [])
+    if "pomodoro_total_seconds" not in data:
+        data["pomodoro_total_seconds"] = sum(r.get("seconds", 0) for r in data["pomodoro_records"])
     data.setdefault("pomodoro_state", {"running": False, "start": None, "duration": 0})
     data.setdefault("word_books", {})
     data.setdefault("habits", [])
     data.setdefault("forum_posts", [])
     data.setdefault("forum_comments", [])
+    data["events"].sort(key=event_sort_key)
+    backfill_event_minutes(data["events"])
+    data["archives"].sort(key=archive_sort_key)
     return data
 
 
 def db_save_user_data(user_id: str, data: dict):
     client = get_supabase_client()
     if not client:
-        return
+        return False
     try:
         client.table("user_data").upsert({"user_id": user_id, "data": data}).execute()
     except Exception as exc:
         _set_supabase_unavailable(exc)
-        return
+        return False
+    return True
 
 
 def test_supabase_connection() -> tuple[bool, str]:
@@ -547,48 +705,59 @@ def today_local() -> date:
 
 
 def to_minutes(time_str: str) -> int:
+    # only used on loaded data, which may hold unpadded times such as "9:30"
     h, m = map(int, time_str.split(":"))
     return h * 60 + m
 
 
-def layout_day_events(events):
-    if not events:
-        return []
-    items = []
-    for ev in sorted(events, key=lambda x: x["start"]):
-        start = to_minutes(ev["start"])
-        end = to_minutes(ev["end"])
-        if end <= start:
-            end += 24 * 60
-        items.append({"event": ev, "start": start, "end": end})
-
-    layouts = []
+@lru_cache(maxsize=512)
+def _layout_columns(spans: tuple) -> tuple:
+    # spans are (start, end) minute pairs in start order; returns (col, cols) for each
+    slots = []
     cluster = []
     active = []
 
     def flush_cluster():
         if not cluster:
             return
-        max_cols = max(item["col"] for item in cluster) + 1
-        for item in cluster:
-            item["cols"] = max_cols
-            layouts.append(item)
+        max_cols = max(slots[i][0] for i in cluster) + 1
+        for i in cluster:
+            slots[i] = (slots[i][0], max_cols)
 
-    for item in items:
-        active = [a for a in active if a["end"] > item["start"]]
+    for i, (start, end) in enumerate(spans):
+        active = [a for a in active if a[1] > start]
         if not active:
             flush_cluster()
             cluster = []
-        used = {a["col"] for a in active}
+        used = {a[0] for a in active}
         col = 0
         while col in used:
             col += 1
-        entry = {"event": item["event"], "start": item["start"], "end": item["end"], "col": col, "cols": 1}
-        active.append(entry)
-        cluster.append(entry)
+        slots.append((col, 1))
+        active.append((col, end))
+        cluster.append(i)
 
     flush_cluster()
-    return layouts
+    return tuple(slots)
+
+
+def layout_day_events(events):
+    if not events:
+        return []
+    # callers pass events already in start order
+    spans = []
+    for ev in events:
+        start = ev["start_min"]
+        end = ev["end_min"]
+        if end <= start:
+            end += 24 * 60
+        spans.append((start, end))
+    # the packing only depends on the times, so days with the same schedule share it across reruns
+    slots = _layout_columns(tuple(spans))
+    return [
+        {"event": ev, "start": start, "end": end, "col": col, "cols": cols}
+        for ev, (start, end), (col, cols) in zip(events, spans, slots)
+    ]
 
 
 def format_seconds(total: int) -> str:
@@ -597,7 +766,47 @@ def format_seconds(total: int) -> str:
     s = total % 60
     return f"{m:02d}:{s:02d}"
 
+def pomodoro_countdown_html(duration: int, elapsed: int, recorded_seconds: int) -> str:
+    # counts from the server's elapsed time with a local monotonic clock, so browser clock skew doesn't matter
+    return f"""
+<div style="font-family: 'Source Sans Pro', sans-serif; font-weight: 700; color: #1F3B57;">
+  <div id="focus" style="font-size: 20px; text-align: right;"></div>
+  <div id="timer" style="font-size: 42px; text-align: center;"></div>
+</div>
+<script>
+const duration = {duration}, elapsed0 = {elapsed}, recorded = {recorded_seconds};
+const t0 = performance.now();
+const pad = (n) => String(n).padStart(2, "0");
+function tick() {{
+  const elapsed = Math.min(duration, elapsed0 + Math.floor((performance.now() - t0) / 1000));
+  const left = duration - elapsed;
+  const total = recorded + elapsed;
+  document.getElementById("focus").textContent = `你已专注了${{Math.floor(total / 3600)}}小时${{Math.floor((total % 3600) / 60)}}分钟`;
+  document.getElementById("timer").textContent = `${{pad(Math.floor(left / 60))}}:${{pad(left % 60)}}`;
+  if (left > 0) setTimeout(tick, 250);
+}}
+tick();
+</script>
+"""
+
+
+# persist_data only queues the latest payload; it is written once, before a rerun or at script end.
+# the queue lives in session_state because widget callbacks run between two script runs and
+# queue their saves there; the next run flushes them before loading
+def flush_pending_save():
+    pending = st.session_state.get("pending_saves")
+    if pending:
+        payload = pending[-1][0]
+        # the log can only stand in for a snapshot if every change was described by ops
+        ops = None
+        if all(entry_ops for _, entry_ops in pending):
+            ops = [op for _, entry_ops in pending for op in entry_ops]
+        pending.clear()
+        _write_user_data(payload, ops)
+
+
 def safe_rerun():
+    flush_pending_save()
     if hasattr(st, "rerun"):
         st.rerun()
     else:
@@ -609,16 +818,85 @@ def maybe_autorefresh(interval_ms: int, key: str) -> bool:
         return True
     return False
 
+
+# partial reruns need streamlit >= 1.33; older versions fall back to st_autorefresh
+st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def render_page(render):
+    # inside a fragment, widget clicks rerun just this page instead of the whole script
+    if st_fragment is None:
+        render()
+        return
+
+    def _page_fragment():
+        render()
+        flush_pending_save()
+
+    st_fragment(_page_fragment)()
+
+
+# read-only summary charts: no toolbar, no zoom/pan handlers in the browser
+STATS_CHART_CONFIG = {"displayModeBar": False, "scrollZoom": False, "doubleClick": False}
+
+
+# figures are shared read-only between sessions and rebuilt only when the totals change;
+# every edit produces new totals, so keep only the recent ones
+@st.cache_resource(show_spinner=False, max_entries=64)
+def build_stats_figures(totals: tuple):
+    # totals line up with CATEGORIES
+    bar_fig = go.Figure(
+        data=[
+            go.Bar(
+                x=CATEGORIES,
+                y=totals,
+                marker_color=CATEGORY_COLOR_LIST,
+            )
+        ]
+    )
+    bar_fig.update_layout(
+        title="本周分类时长",
+        yaxis_title="分钟",
+        height=360,
+        margin=dict(l=40, r=20, t=60, b=40),
+        font=dict(family="Microsoft YaHei, SimHei, Arial", size=14),
+    )
+
+    shown = [i for i, v in enumerate(totals) if v > 0]
+    values = [totals[i] for i in shown]
+    labels = [CATEGORIES[i] for i in shown]
+    if values:
+        pie_fig = go.Figure(
+            data=[
+                go.Pie(
+                    labels=labels,
+                    values=values,
+                    textinfo="percent",
+                    insidetextorientation="radial",
+                    marker=dict(colors=[CATEGORY_COLOR_LIST[i] for i in shown]),
+                )
+            ]
+        )
+    else:
+        pie_fig = go.Figure()
+        pie_fig.add_annotation(text="暂无数据", x=0.5, y=0.5, showarrow=False)
+    pie_fig.update_layout(
+        title="分类占比",
+        height=360,
+        margin=dict(l=20, r=20, t=60, b=40),
+        font=dict(family="Microsoft YaHei, SimHei, Arial", size=14),
+    )
+    return bar_fig, pie_fig
+
+ARCHIVE_PAGE_SIZE = 20
+
 TIME_START = 6
 TIME_END = 22
 HOUR_HEIGHT = 40
 DAY_HEIGHT = (TIME_END - TIME_START) * HOUR_HEIGHT
 
 
-st.set_page_config(page_title="My Diary", layout="wide")
-
-st.markdown(
-    """
+BASE_CSS = """
 <style>
 body { background-color: #EEF5FF; }
 .block-container { padding-top: 1.5rem; }
@@ -630,7 +908,8 @@ body { background-color: #EEF5FF; }
 .timer-text { font-size: 42px; font-weight: 700; text-align: center; color: #1F3B57; }
 .focus-text { font-size: 20px; font-weight: 700; color: #1F3B57; text-align: right; }
 .week-day-card { padding: 8px 10px; border-radius: 10px; border: 1px solid #C9DBF2; background: #F7FAFF; margin-bottom: 6px; }
-.week-day-card.flash-on { background: #C9D6F2; border-color: #9CB4E0; }
+@keyframes week-card-flash { 0% { background: #C9D6F2; border-color: #9CB4E0; } 50% { background: #F7FAFF; border-color: #C9DBF2; } }
+.week-day-card.flash-on { animation: week-card-flash 0.5s step-end 3; }
 .week-day-btn, .week-day-btn * { font-family: "Segoe Script", "Bradley Hand", "Comic Sans MS", cursive !important; }
 .week-day-btn .stButton > button,
 .week-day-btn .stButton button,
@@ -640,7 +919,8 @@ body { background-color: #EEF5FF; }
 .week-day-btn button span,
 .week-day-btn .stButton > button * { white-space: pre; word-break: keep-all; }
 .week-day-btn .stButton > button:hover { border-color: #9CB4E0; background: #EEF5FF; }
-.week-day-btn.flash-on .stButton > button { background: #9CB4E0; border-color: #6F8FC7; color: #1F3B57; }
+@keyframes week-day-flash { 0% { background: #9CB4E0; border-color: #6F8FC7; } 50% { background: #F7FAFF; border-color: #C9DBF2; } }
+.week-day-btn.flash-on .stButton > button { animation: week-day-flash 0.5s step-end 3; }
 .detail-event-btn .stButton > button { width: 100%; text-align: left; border: 1px solid #E2EAF5; border-radius: 10px; background: #FFFFFF; padding: 8px 10px; }
 .detail-event-btn .stButton > button:hover { border-color: #9CB4E0; background: #EEF5FF; }
 .detail-panel { background: #FFFFFF; border-radius: 14px; border: 1px solid #E2EAF5; padding: 14px 16px; margin: 8px 0 16px; }
@@ -671,9 +951,113 @@ body { background-color: #EEF5FF; }
 .habit-card.complete .stButton > button { background: #E7F7E8; border-color: #BFE8C6; }
 .habit-record { padding: 8px 10px; border-radius: 8px; border: 1px solid #E2EAF5; margin: 6px 0; }
 </style>
-""",
-    unsafe_allow_html=True,
-)
+"""
+
+SIDEBAR_HIDDEN_CSS = """
+<style>
+section[data-testid="stSidebar"] { display: none; }
+section.main { margin-left: 0 !important; }
+</style>
+"""
+
+DARK_CSS = """
+<style>
+html, body, .stApp, header, footer,
+div[data-testid="stAppViewContainer"],
+div[data-testid="stHeader"],
+div[data-testid="stToolbar"],
+section[data-testid="stSidebar"] ~ main,
+section[data-testid="stSidebar"] ~ div { background-color: #1D2430 !important; }
+.block-container { background-color: #1D2430 !important; }
+section[data-testid="stSidebar"] { background-color: #252D3A; }
+.title, .subtitle, .section-title, .stMarkdown, .stCaption,
+.stMarkdown h1, .stMarkdown h2, .stMarkdown h3, .stMarkdown h4, .stMarkdown h5, .stMarkdown h6,
+.stMarkdown p, .stMarkdown div,
+label, .stTextInput label, .stSelectbox label, .stDateInput label,
+.stTimeInput label, .stTextArea label { color: #E7EDF7 !important; }
+.card, .detail-panel { background: #252D3A; border-color: #3A4A5F; color: #E7EDF7; }
+.stButton > button { background: #2A3450; border-color: #3A4A5F; color: #E7EDF7; }
+.stButton > button:hover { background: #33405C; }
+.month-cell { background: #2A3445; border-color: #3A4A5F; color: #E7EDF7; }
+.month-cell.good { background: #E7F7E8 !important; border-color: #BFE8C6 !important; color: #1F3B57 !important; }
+.month-cell.bad { background: #FBE7E7 !important; border-color: #F1B9B9 !important; color: #1F3B57 !important; }
+.month-weekday { color: #9FB3C8; }
+.event-card, .detail-event-btn .stButton > button { background: #202735; border-color: #3A4A5F; color: #E7EDF7; }
+.event-block { color: #1F3B57; }
+input, textarea, select { background-color: #202735 !important; color: #E7EDF7 !important; border-color: #3A4A5F !important; }
+div[data-testid="stAppViewContainer"] .event-block {
+    background: #C7D2E6 !important;
+    border-color: #C7D2E6 !important;
+    color: #0B0F14 !important;
+}
+div[data-testid="stAppViewContainer"] .event-block * { color: #0B0F14 !important; }
+div[data-testid="stExpander"] > details > summary,
+div[data-testid="stExpander"] > details > summary * { color: #E7EDF7 !important; }
+div[data-testid="stExpander"] div[data-testid="stMarkdownContainer"],
+div[data-testid="stExpander"] .stMarkdown { color: #E7EDF7 !important; }
+#theme-toggle-anchor + div .stButton > button { background: #2A3450; border-color: #3A4A5F; color: #E7EDF7; }
+#theme-toggle-anchor + div .stButton > button:hover { background: #33405C; }
+.stSidebar svg, .stSidebar [data-testid="stSelectbox"] svg,
+.stSidebar [data-testid="stDateInput"] svg, .stSidebar [data-testid="stTimeInput"] svg,
+.stSidebar [data-testid="stTextInput"] svg, .stSidebar [data-testid="stTextArea"] svg,
+main svg, main [data-testid="stSelectbox"] svg, main [data-testid="stDateInput"] svg,
+main [data-testid="stTimeInput"] svg, main [data-testid="stTextInput"] svg, main [data-testid="stTextArea"] svg {
+    color: #2A3450 !important;
+    fill: #2A3450 !important;
+    stroke: #2A3450 !important;
+}
+</style>
+"""
+
+PAGE_BG_MAP = {
+    "本周计划": "#EAF2FF",
+    "习惯养成": "#EEF9F1",
+    "番茄钟": "#FFF3E6",
+    "心情": "#F4F0FF",
+    "单词学习": "#EAF8FF",
+    "统计": "#F8F5E8",
+    "树洞": "#FCEFF4",
+}
+
+
+def page_bg_css(page_bg: str) -> str:
+    return f"""
+<style>
+body, .stApp, .block-container,
+div[data-testid="stAppViewContainer"],
+div[data-testid="stHeader"],
+div[data-testid="stToolbar"],
+div[data-testid="stDecoration"],
+header,
+section[data-testid="stSidebar"] ~ main,
+section[data-testid="stSidebar"] ~ div {{ background-color: {page_bg} !important; }}
+.card, .detail-panel, .event-card, .detail-card, .habit-record,
+.week-day-card, .day-timeline {{ background: {page_bg} !important; }}
+</style>
+"""
+
+
+# the light-theme backgrounds are fixed per page, so format them once
+PAGE_BG_CSS = {page: page_bg_css(bg) for page, bg in PAGE_BG_MAP.items()}
+DEFAULT_PAGE_BG_CSS = page_bg_css("#EEF5FF")
+
+
+@lru_cache(maxsize=None)
+def theme_override_css(sidebar_collapsed: bool, dark_mode: bool, page: str) -> str:
+    # a handful of combinations, each composed once per process
+    parts = []
+    if sidebar_collapsed:
+        parts.append(SIDEBAR_HIDDEN_CSS)
+    if dark_mode:
+        parts.append(DARK_CSS)
+    else:
+        parts.append(PAGE_BG_CSS.get(page, DEFAULT_PAGE_BG_CSS))
+    return "".join(parts)
+
+
+st.set_page_config(page_title="My Diary", layout="wide")
+
+st.markdown(BASE_CSS, unsafe_allow_html=True)
 
 storage_mode = get_storage_mode()
 if storage_mode == "local" and st.session_state.get("supabase_error"):
@@ -794,6 +1178,37 @@ if "user" not in st.session_state:
                         st.success("注册成功，请登录")
     st.stop()
 
+def persist_data(payload: dict, *ops: dict):
+    st.session_state.setdefault("pending_saves", []).append((payload, ops))
+
+
+def _write_user_data(payload: dict, ops: list | None = None):
+    # edits can move an event; restore (date, start) order before it is stored or reused
+    payload["events"].sort(key=event_sort_key)
+    if storage_mode == "supabase":
+        serialized = _json_dumps(payload)
+        # skip writing back exactly what this session last stored
+        if st.session_state.get("persisted_snapshot") == (st.session_state.user, serialized):
+            return
+        if db_save_user_data(st.session_state.user_id, payload):
+            st.session_state.persisted_snapshot = (st.session_state.user, serialized)
+        return
+
+    log_path = user_data_file + USER_LOG_SUFFIX
+    stamps = (_file_stamp(user_data_file), _file_stamp(log_path))
+    loaded = st.session_state.get("loaded_data")
+    # ops only describe the change if this dict is exactly what the files on disk hold
+    if ops and loaded is not None and loaded[0] == (user_data_file, *stamps) and loaded[1] is payload:
+        append_data_log(user_data_file, b"".join(_json_line(op) + b"\n" for op in ops))
+        # keep replay a small fraction of a cold load
+        if os.path.getsize(log_path) > max(USER_LOG_MIN_BYTES, stamps[0][1] // USER_LOG_MAX_FRACTION):
+            save_data(payload, user_data_file)
+    else:
+        save_data(payload, user_data_file)
+    stamps = (_file_stamp(user_data_file), _file_stamp(log_path))
+    st.session_state.loaded_data = ((user_data_file, *stamps), payload)
+
+
 if storage_mode == "supabase":
     if "user_id" not in st.session_state:
         info = db_get_user(st.session_state.user)
@@ -801,22 +1216,26 @@ if storage_mode == "supabase":
             del st.session_state.user
             safe_rerun()
         st.session_state.user_id = info["id"]
+    flush_pending_save()
     data = db_load_user_data(st.session_state.user_id)
 else:
     user_data_file = os.path.join(USER_DATA_DIR, f"{st.session_state.user}.json")
+    flush_pending_save()
     data = load_data(user_data_file)
 
-def persist_data(payload: dict):
-    if storage_mode == "supabase":
-        db_save_user_data(st.session_state.user_id, payload)
-    else:
-        save_data(payload, user_data_file)
+event_index = {e["id"]: i for i, e in enumerate(data["events"])}
+
+# read the clock once per run; fragments and widget callbacks run on their own
+# schedule and keep calling today_local()/now_local()
+run_now = now_local()
+run_today = run_now.date()
+today_key = run_today.isoformat()
 
 header_cols = st.columns([2, 2, 2])
 with header_cols[0]:
     st.markdown("<div class='title'>My Diary</div>", unsafe_allow_html=True)
 with header_cols[1]:
-    bjt_time = now_local().strftime("%H:%M")
+    bjt_time = run_now.strftime("%H:%M")
     st.markdown(
         f"<div style='text-align:center; font-size:20px; color:#1F3B57; font-weight:700;'>北京时间 {bjt_time}</div>",
         unsafe_allow_html=True,
@@ -828,17 +1247,18 @@ try:
 except Exception:
     pass
 
-today_key = today_local().strftime("%Y-%m-%d")
 if not data["moods"].get(today_key) and not st.session_state.get("mood_skipped"):
     st.markdown("<div class='section-title'>欢迎回家，今天的心情怎样？</div>", unsafe_allow_html=True)
-    cols = st.columns(8)
-    for i, mood in enumerate(MOODS):
-        with cols[i % 8]:
-            if st.button(mood, key=f"mood_{i}"):
-                _, emoji = split_mood(mood)
-                data["moods"][today_key] = emoji
-                persist_data(data)
-                safe_rerun()
+    # one choice widget instead of a button per mood
+    if hasattr(st, "pills"):
+        mood = st.pills("心情", MOODS, key="mood_pick", label_visibility="collapsed")
+    else:
+        mood = st.radio("心情", MOODS, index=None, horizontal=True, key="mood_pick", label_visibility="collapsed")
+    if mood:
+        _, emoji = split_mood(mood)
+        data["moods"][today_key] = emoji
+        persist_data(data, {"op": "set_mood", "date": today_key, "emoji": emoji})
+        safe_rerun()
     if st.button("跳过"):
         st.session_state.mood_skipped = True
         safe_rerun()
@@ -855,8 +1275,6 @@ if "pending_page" in st.session_state:
     del st.session_state.pending_page
 if "week_flash_target" not in st.session_state:
     st.session_state.week_flash_target = None
-    st.session_state.week_flash_step = 0
-    st.session_state.week_flash_on = False
 if "sidebar_collapsed" not in st.session_state:
     st.session_state.sidebar_collapsed = False
 if "editing_event_id" not in st.session_state:
@@ -919,12 +1337,10 @@ if "forum_comment_feedback" not in st.session_state:
 if "jump_day" in st.query_params:
     jump_value = st.query_params.get("jump_day")
     try:
-        jump_day = datetime.strptime(jump_value, "%Y-%m-%d").date()
+        jump_day = date.fromisoformat(jump_value)
         st.session_state.pending_page = "本周计划"
         st.session_state.week_pick = jump_day
-        st.session_state.week_flash_target = jump_day.strftime("%Y-%m-%d")
-        st.session_state.week_flash_step = 0
-        st.session_state.week_flash_on = True
+        st.session_state.week_flash_target = jump_day.isoformat()
         st.query_params.clear()
         safe_rerun()
     except Exception:
@@ -937,110 +1353,30 @@ if st.session_state.page != st.session_state.last_page:
         st.session_state.sidebar_collapsed = True
     st.session_state.last_page = st.session_state.page
 
-if st.session_state.sidebar_collapsed:
-    st.markdown(
-        """
-<style>
-section[data-testid="stSidebar"] { display: none; }
-section.main { margin-left: 0 !important; }
-</style>
-""",
-        unsafe_allow_html=True,
-    )
+def _on_nav_change():
+    name = st.session_state.nav_choice
+    # a segmented control can be clicked off; keep the current page then
+    if name is None:
+        return
+    st.session_state.page = name
+    if name != "本周计划":
+        st.session_state.sidebar_collapsed = True
 
-if st.session_state.dark_mode:
-    st.markdown(
-        """
-<style>
-html, body, .stApp, header, footer,
-div[data-testid="stAppViewContainer"],
-div[data-testid="stHeader"],
-div[data-testid="stToolbar"],
-section[data-testid="stSidebar"] ~ main,
-section[data-testid="stSidebar"] ~ div { background-color: #1D2430 !important; }
-.block-container { background-color: #1D2430 !important; }
-section[data-testid="stSidebar"] { background-color: #252D3A; }
-.title, .subtitle, .section-title, .stMarkdown, .stCaption,
-.stMarkdown h1, .stMarkdown h2, .stMarkdown h3, .stMarkdown h4, .stMarkdown h5, .stMarkdown h6,
-.stMarkdown p, .stMarkdown div,
-label, .stTextInput label, .stSelectbox label, .stDateInput label,
-.stTimeInput label, .stTextArea label { color: #E7EDF7 !important; }
-.card, .detail-panel { background: #252D3A; border-color: #3A4A5F; color: #E7EDF7; }
-.stButton > button { background: #2A3450; border-color: #3A4A5F; color: #E7EDF7; }
-.stButton > button:hover { background: #33405C; }
-.month-cell { background: #2A3445; border-color: #3A4A5F; color: #E7EDF7; }
-.month-cell.good { background: #E7F7E8 !important; border-color: #BFE8C6 !important; color: #1F3B57 !important; }
-.month-cell.bad { background: #FBE7E7 !important; border-color: #F1B9B9 !important; color: #1F3B57 !important; }
-.month-weekday { color: #9FB3C8; }
-.event-card, .detail-event-btn .stButton > button { background: #202735; border-color: #3A4A5F; color: #E7EDF7; }
-.event-block { color: #1F3B57; }
-input, textarea, select { background-color: #202735 !important; color: #E7EDF7 !important; border-color: #3A4A5F !important; }
-div[data-testid="stAppViewContainer"] .event-block {
-    background: #C7D2E6 !important;
-    border-color: #C7D2E6 !important;
-    color: #0B0F14 !important;
-}
-div[data-testid="stAppViewContainer"] .event-block * { color: #0B0F14 !important; }
-div[data-testid="stExpander"] > details > summary,
-div[data-testid="stExpander"] > details > summary * { color: #E7EDF7 !important; }
-div[data-testid="stExpander"] div[data-testid="stMarkdownContainer"],
-div[data-testid="stExpander"] .stMarkdown { color: #E7EDF7 !important; }
-#theme-toggle-anchor + div .stButton > button { background: #2A3450; border-color: #3A4A5F; color: #E7EDF7; }
-#theme-toggle-anchor + div .stButton > button:hover { background: #33405C; }
-.stSidebar svg, .stSidebar [data-testid="stSelectbox"] svg,
-.stSidebar [data-testid="stDateInput"] svg, .stSidebar [data-testid="stTimeInput"] svg,
-.stSidebar [data-testid="stTextInput"] svg, .stSidebar [data-testid="stTextArea"] svg,
-main svg, main [data-testid="stSelectbox"] svg, main [data-testid="stDateInput"] svg,
-main [data-testid="stTimeInput"] svg, main [data-testid="stTextInput"] svg, main [data-testid="stTextArea"] svg {
-    color: #2A3450 !important;
-    fill: #2A3450 !important;
-    stroke: #2A3450 !important;
-}
-</style>
-""",
-        unsafe_allow_html=True,
-    )
 
-nav_cols = st.columns(len(PAGES))
-for i, name in enumerate(PAGES):
-    with nav_cols[i]:
-        btn_type = "primary" if st.session_state.page == name else "secondary"
-        if st.button(name, key=f"nav_{name}", type=btn_type):
-            st.session_state.page = name
-            if name != "本周计划":
-                st.session_state.sidebar_collapsed = True
-            safe_rerun()
+st.session_state.nav_choice = st.session_state.page
+if hasattr(st, "segmented_control"):
+    st.segmented_control("页面", PAGES, key="nav_choice", on_change=_on_nav_change, label_visibility="collapsed")
+else:
+    st.radio("页面", PAGES, horizontal=True, key="nav_choice", on_change=_on_nav_change, label_visibility="collapsed")
 
 selected_page = st.session_state.page
 
-if not st.session_state.dark_mode:
-    page_bg_map = {
-        "本周计划": "#EAF2FF",
-        "习惯养成": "#EEF9F1",
-        "番茄钟": "#FFF3E6",
-        "心情": "#F4F0FF",
-        "单词学习": "#EAF8FF",
-        "统计": "#F8F5E8",
-        "树洞": "#FCEFF4",
-    }
-    page_bg = page_bg_map.get(selected_page, "#EEF5FF")
-    st.markdown(
-        f"""
-<style>
-body, .stApp, .block-container,
-div[data-testid="stAppViewContainer"],
-div[data-testid="stHeader"],
-div[data-testid="stToolbar"],
-div[data-testid="stDecoration"],
-header,
-section[data-testid="stSidebar"] ~ main,
-section[data-testid="stSidebar"] ~ div {{ background-color: {page_bg} !important; }}
-.card, .detail-panel, .event-card, .detail-card, .habit-record,
-.week-day-card, .day-timeline {{ background: {page_bg} !important; }}
-</style>
-""",
-        unsafe_allow_html=True,
-    )
+# the per-run overrides go out as a single message
+st.markdown(
+    theme_override_css(bool(st.session_state.sidebar_collapsed), bool(st.session_state.dark_mode), selected_page),
+    unsafe_allow_html=True,
+)
+
 
 def _reset_event_form():
     st.session_state.event_title = "新日程"
@@ -1054,7 +1390,7 @@ def _reset_event_form():
 
 def _bind_event_form(ev: dict):
     st.session_state.event_title = ev.get("title", "") or "未命名"
-    st.session_state.event_date = datetime.strptime(ev["date"], "%Y-%m-%d").date()
+    st.session_state.event_date = date.fromisoformat(ev["date"])
     st.session_state.event_start = datetime.strptime(ev["start"], "%H:%M").time()
     st.session_state.event_end = datetime.strptime(ev["end"], "%H:%M").time()
     cat = ev.get("category", "其他")
@@ -1078,7 +1414,7 @@ def _save_temp_to_book(data_ref: dict):
     if not st.session_state.word_temp_list:
         st.session_state.word_temp_feedback = "今日临时列表为空"
         return
-    today_key = today_local().strftime("%Y-%m-%d")
+    today_key = today_local().isoformat()
     data_ref.setdefault("word_books", {})
     data_ref["word_books"].setdefault(today_key, [])
     data_ref["word_books"][today_key].extend(st.session_state.word_temp_list)
@@ -1123,7 +1459,8 @@ def _stop_test():
 
 
 if st.session_state.editing_event_id:
-    _editing_event = next((e for e in data["events"] if e["id"] == st.session_state.editing_event_id), None)
+    _editing_idx = event_index.get(st.session_state.editing_event_id)
+    _editing_event = None if _editing_idx is None else data["events"][_editing_idx]
     if _editing_event and st.session_state.event_form_bound_id != _editing_event["id"]:
         _bind_event_form(_editing_event)
 elif st.session_state.event_form_bound_id is not None:
@@ -1155,39 +1492,42 @@ if not st.session_state.sidebar_collapsed:
             if submitted:
                 payload = {
                     "title": t.strip() or "未命名",
-                    "date": d.strftime("%Y-%m-%d"),
+                    "date": d.isoformat(),
                     "start": start.strftime("%H:%M"),
                     "end": end.strftime("%H:%M"),
+                    "start_min": start.hour * 60 + start.minute,
+                    "end_min": end.hour * 60 + end.minute,
                     "category": cat,
                     "notes": notes.strip(),
                 }
                 if edit_mode:
-                    for idx, item in enumerate(data["events"]):
-                        if item["id"] == st.session_state.editing_event_id:
-                            payload["id"] = item["id"]
-                            data["events"][idx] = payload
-                            break
-                    persist_data(data)
+                    idx = event_index.get(st.session_state.editing_event_id)
+                    if idx is not None:
+                        payload["id"] = st.session_state.editing_event_id
+                        data["events"][idx] = payload
+                        persist_data(data, {"op": "put_event", "event": payload})
                     st.session_state.editing_event_id = None
                     _reset_event_form()
                     st.success("已更新")
                     safe_rerun()
                 else:
                     payload["id"] = str(uuid.uuid4())
-                    data["events"].append(payload)
-                    persist_data(data)
+                    bisect.insort_right(data["events"], payload, key=event_sort_key)
+                    event_index = {e["id"]: i for i, e in enumerate(data["events"])}
+                    persist_data(data, {"op": "put_event", "event": payload})
                     st.success("已保存")
 
 if st.session_state.delete_target_id:
-    target = next((e for e in data["events"] if e["id"] == st.session_state.delete_target_id), None)
+    _target_idx = event_index.get(st.session_state.delete_target_id)
+    target = None if _target_idx is None else data["events"][_target_idx]
     if target:
         st.warning("是否删除该日程？")
         st.caption(f"{target.get('start', '')}-{target.get('end', '')} {target.get('title', '')}")
         confirm_cols = st.columns(2)
         with confirm_cols[0]:
             if st.button("确认删除", key="confirm_delete"):
-                data["events"] = [e for e in data["events"] if e["id"] != target["id"]]
-                persist_data(data)
+                del data["events"][_target_idx]
+                persist_data(data, {"op": "delete_event", "id": target["id"]})
                 if st.session_state.editing_event_id == target["id"]:
                     st.session_state.editing_event_id = None
                     _reset_event_form()
@@ -1203,17 +1543,39 @@ if st.session_state.delete_target_id:
         pass
 
 
-if selected_page == "本周计划":
+def event_block_html(item: dict, range_start: int, range_end: int, px_per_minute: float) -> str:
+    ev = item["event"]
+    start = max(item["start"], range_start)
+    end = min(item["end"], range_end)
+    top = int((start - range_start) * px_per_minute)
+    height = max(36, int(max(30, end - start) * px_per_minute))
+    block_style = EVENT_BLOCK_STYLES.get(ev.get("category"), EVENT_BLOCK_STYLES["其他"])
+    cols = item["cols"]
+    return (
+        "<div class='event-block' "
+        f"style='top:{top}px; height:{height}px; left:{item['col'] / cols * 100}%; width:calc({100 / cols}% - 6px); "
+        f"{block_style}'>"
+        "<div class='event-delete'>🗑</div>"
+        f"<div class='event-block-time'>{ev['start']}-{ev['end']}</div>"
+        f"<div>{ev['title']}</div>"
+        "</div>"
+    )
+
+
+def render_week_page():
     st.markdown("<div class='section-title'>本周计划</div>", unsafe_allow_html=True)
     picked = st.date_input("选择周中的任意日期", value=today_local(), key="week_pick")
     week_start = iso_week_start(picked)
     st.markdown(f"**周：{week_start.strftime('%Y/%m/%d')} - {(week_start + timedelta(days=6)).strftime('%Y/%m/%d')}**")
 
+    events_by_date = {}
+    for e in events_between(data["events"], week_start.isoformat(), (week_start + timedelta(days=6)).isoformat()):
+        events_by_date.setdefault(e["date"], []).append(e)
+
     if st.session_state.get("day_detail_date"):
         detail_date = st.session_state.day_detail_date
-        detail_events = [e for e in data["events"] if e["date"] == detail_date]
-        st.markdown("<div class='detail-panel'>", unsafe_allow_html=True)
-        st.markdown(f"#### {detail_date} 全部日程")
+        detail_events = events_between(data["events"], detail_date, detail_date)
+        st.markdown(f"<div class='detail-panel'>\n\n#### {detail_date} 全部日程", unsafe_allow_html=True)
         close_cols = st.columns([1, 5])
         with close_cols[0]:
             if st.button("关闭", key="close_day_detail"):
@@ -1221,37 +1583,47 @@ if selected_page == "本周计划":
                 safe_rerun()
         if not detail_events:
             st.info("暂无日程")
+            st.markdown("</div>", unsafe_allow_html=True)
         else:
+            # each markup run between two buttons goes out as one element;
+            # the spacer after an event rides along with the next one
+            lead = ""
             for ev in detail_events:
-                st.markdown("<div class='detail-event-btn'>", unsafe_allow_html=True)
+                st.markdown(f"{lead}<div class='detail-event-btn'>", unsafe_allow_html=True)
                 if st.button(f"{ev['start']} - {ev['end']}  {ev['title']}", key=f"pick_event_{ev['id']}"):
                     st.session_state.editing_event_id = ev["id"]
                     st.session_state.sidebar_collapsed = False
                     _bind_event_form(ev)
                     safe_rerun()
-                st.markdown("</div>", unsafe_allow_html=True)
-                st.write(f"类型：{ev.get('category', '其他')}")
-                notes = ev.get("notes", "").strip()
-                st.write(f"备注：{notes if notes else '无'}")
+                notes = html.escape(ev.get("notes", "").strip())
+                category = html.escape(ev.get("category", "其他"))
+                # user text shares an element with raw markup, so it has to be escaped
+                st.markdown(
+                    f"</div>\n\n类型：{category}  \n备注：{notes if notes else '无'}",
+                    unsafe_allow_html=True,
+                )
                 if st.button("🗑 删除", key=f"delete_event_{ev['id']}"):
                     st.session_state.delete_target_id = ev["id"]
                     st.session_state.sidebar_collapsed = False
                     safe_rerun()
-                st.markdown("<div style='height:6px'></div>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+                lead = "<div style='height:6px'></div>"
+            st.markdown(f"{lead}</div>", unsafe_allow_html=True)
 
+    # the blink itself is a CSS animation; the class only has to be there for one render
     flash_target = st.session_state.week_flash_target
-    flash_on = st.session_state.week_flash_on
-    flash_step = st.session_state.week_flash_step
+    st.session_state.week_flash_target = None
+
+    range_start = TIME_START * 60
+    range_end = TIME_END * 60
+    px_per_minute = DAY_HEIGHT / (range_end - range_start)
 
     day_cols = st.columns(7)
     for i in range(7):
         d = week_start + timedelta(days=i)
-        day_key = d.strftime("%Y-%m-%d")
-        events = [e for e in data["events"] if e["date"] == day_key]
+        day_key = d.isoformat()
+        events = events_by_date.get(day_key, ())
         with day_cols[i]:
-            is_flash = flash_target == day_key and flash_on
-            container_class = "week-day-btn flash-on" if is_flash else "week-day-btn"
+            container_class = "week-day-btn flash-on" if flash_target == day_key else "week-day-btn"
             st.markdown(f"<div class='{container_class}'>", unsafe_allow_html=True)
             label_en = WEEKDAY_SHORT_EN[d.weekday()]
             label_cn = WEEKDAY_CN[d.weekday()]
@@ -1261,7 +1633,7 @@ if selected_page == "本周计划":
             if not events:
                 st.caption("无日程")
             else:
-                for ev in sorted(events, key=lambda x: x["start"]):
+                for ev in events:
                     action_cols = st.columns([8, 1])
                     with action_cols[0]:
                         st.caption(f"{ev['start']}-{ev['end']}  {ev['title']}")
@@ -1270,49 +1642,19 @@ if selected_page == "本周计划":
                             st.session_state.delete_target_id = ev["id"]
                             st.session_state.sidebar_collapsed = False
                             safe_rerun()
-                layouts = layout_day_events(events)
-                html_blocks = ["<div class='day-timeline'>"]
-                range_start = TIME_START * 60
-                range_end = TIME_END * 60
-                for item in layouts:
-                    ev = item["event"]
-                    start = item["start"]
-                    end = item["end"]
-                    if end <= range_start or start >= range_end:
-                        continue
-                    start = max(start, range_start)
-                    end = min(end, range_end)
-                    duration = max(30, end - start)
-                    top = int((start - range_start) / (range_end - range_start) * DAY_HEIGHT)
-                    height = max(36, int(duration / (range_end - range_start) * DAY_HEIGHT))
-                    color = CATEGORY_COLORS.get(ev.get("category", "其他"), "#E8E0FF")
-                    left_pct = item["col"] / item["cols"] * 100
-                    width_pct = 100 / item["cols"]
-                    html_blocks.append(
-                        "<div class='event-block' "
-                        f"style='top:{top}px; height:{height}px; left:{left_pct}%; width:calc({width_pct}% - 6px); "
-                        f"background:{color}; border-color:{color};'>"
-                        f"<div class='event-delete'>🗑</div>"
-                        f"<div class='event-block-time'>{ev['start']}-{ev['end']}</div>"
-                        f"<div>{ev['title']}</div>"
-                        "</div>"
-                    )
-                html_blocks.append("</div>")
-                st.markdown("".join(html_blocks), unsafe_allow_html=True)
+                blocks = "".join(
+                    event_block_html(item, range_start, range_end, px_per_minute)
+                    for item in layout_day_events(events)
+                    if item["end"] > range_start and item["start"] < range_end
+                )
+                st.markdown(f"<div class='day-timeline'>{blocks}</div>", unsafe_allow_html=True)
 
-    if flash_target and flash_step < 4:
-        time.sleep(0.25)
-        st.session_state.week_flash_on = not flash_on
-        st.session_state.week_flash_step = flash_step + 1
-        safe_rerun()
-    elif flash_target:
-        st.session_state.week_flash_target = None
-        st.session_state.week_flash_step = 0
-        st.session_state.week_flash_on = False
 
+if selected_page == "本周计划":
+    render_page(render_week_page)
 
 
-if selected_page == "心情":
+def render_mood_page():
     st.markdown("<div class='section-title'>心情</div>", unsafe_allow_html=True)
     today = today_local()
     year_options = list(range(today.year - 2, today.year + 3))
@@ -1330,19 +1672,16 @@ if selected_page == "心情":
     start_offset = (first_weekday - 1) % 7
     day_cursor = 1
 
-    week_headers = ["一", "二", "三", "四", "五", "六", "日"]
-    header_cols = st.columns(7)
-    for i, h in enumerate(week_headers):
-        with header_cols[i]:
-            st.markdown(f"<div class='month-weekday'>{h}</div>", unsafe_allow_html=True)
-
-    html_cells = ["<div class='month-grid'>"]
-    for slot in range(total_slots):
+    # weekday headers are the first row of the grid itself, not seven more columns
+    html_cells = ["<div class='month-grid'>", MONTH_WEEKDAY_HEADER]
+    # only pad out to the end of the last week that holds a day
+    used_slots = min(total_slots, -(-(start_offset + days_in_month) // 7) * 7)
+    for slot in range(used_slots):
         if slot < start_offset or day_cursor > days_in_month:
             html_cells.append("<div></div>")
             continue
         current = m_start.replace(day=day_cursor)
-        date_key = current.strftime("%Y-%m-%d")
+        date_key = current.isoformat()
         mood = data["moods"].get(date_key, "")
         mood_text = MOOD_LABELS.get(mood, "")
         mood_short = mood_text[:2] if mood_text else ""
@@ -1357,6 +1696,10 @@ if selected_page == "心情":
     html_cells.append("</div>")
     st.markdown("".join(html_cells), unsafe_allow_html=True)
 
+
+if selected_page == "心情":
+    render_page(render_mood_page)
+
 if selected_page == "单词学习":
     st.markdown("<div class='section-title'>单词学习</div>", unsafe_allow_html=True)
     left_col, mid_col, right_col = st.columns([1.1, 1.6, 1.1])
@@ -1496,7 +1839,7 @@ if selected_page == "习惯养成":
                         habits.append({
                             "id": str(uuid.uuid4()),
                             "name": habit_name.strip(),
-                            "created": today_local().isoformat(),
+                            "created": today_key,
                             "completed": False,
                             "records": [],
                         })
@@ -1566,8 +1909,8 @@ if selected_page == "习惯养成":
             with confirm_cols[1]:
                 if st.button("取消", key="cancel_delete_habit"):
                     st.session_state.habit_delete_confirm = False
-        today = today_local().isoformat()
-        today_display = today_local().strftime("%Y年%m月%d日")
+        today = today_key
+        today_display = run_today.strftime("%Y年%m月%d日")
         records = selected.get("records", [])
         updated = _ensure_habit_completed(selected)
         if updated:
@@ -1577,7 +1920,9 @@ if selected_page == "习惯养成":
             st.success("恭喜！该习惯已养成")
         else:
             st.markdown(f"**今日：{today_display}**")
-            already = next((r for r in records if r.get("date") == today), None)
+            # look up by date: imported or edited records need not be in date order.
+            # new check-ins are appended, so searching from the end usually finds today at once
+            already = next((r for r in reversed(records) if r.get("date") == today), None)
             done_today = bool(already and already.get("completed"))
             note_today = already.get("note", "") if already else ""
             done_flag = st.checkbox("今天完成了吗？", value=done_today, disabled=already is not None)
@@ -1878,18 +2223,20 @@ if selected_page == "番茄钟":
 
     with left:
         st.markdown("<div class='card'>", unsafe_allow_html=True)
-        if not data["pomodoro_records"]:
+        records = data["pomodoro_records"]
+        if not records:
             st.caption("暂无记录")
-        record_indices = list(range(len(data["pomodoro_records"])))
-        for idx in record_indices[-50:][::-1]:
-            rec = data["pomodoro_records"][idx]
+        # newest 50, walked backwards without copying the list
+        for idx in range(len(records) - 1, max(len(records) - 50, 0) - 1, -1):
+            rec = records[idx]
             row_cols = st.columns([6, 1])
             with row_cols[0]:
                 st.write(f"{rec['start']}  {format_seconds(rec['seconds'])}")
             with row_cols[1]:
                 if st.button("删除", key=f"pomodoro_delete_{idx}"):
-                    data["pomodoro_records"].pop(idx)
-                    persist_data(data)
+                    removed = records.pop(idx)
+                    data["pomodoro_total_seconds"] -= removed.get("seconds", 0)
+                    persist_data(data, {"op": "delete_pomodoro_record", "index": idx})
                     safe_rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -1909,32 +2256,48 @@ if selected_page == "番茄钟":
                 st.session_state.pomodoro_start = None
                 st.session_state.pomodoro_duration = 0
                 data["pomodoro_state"] = {"running": False, "start": None, "duration": 0}
-                persist_data(data)
+                persist_data(data, {"op": "set_pomodoro_state", "state": data["pomodoro_state"]})
             else:
                 elapsed = int(time.time() - start_ts)
                 remaining = max(0, duration - elapsed)
                 if remaining == 0:
                     rec = {
-                        "start": now_local().strftime("%Y-%m-%d %H:%M:%S"),
+                        "start": run_now.strftime("%Y-%m-%d %H:%M:%S"),
                         "seconds": duration,
                     }
                     data["pomodoro_records"].append(rec)
+                    data["pomodoro_total_seconds"] += rec["seconds"]
                     data["pomodoro_state"] = {"running": False, "start": None, "duration": 0}
-                    persist_data(data)
+                    persist_data(
+                        data,
+                        {"op": "add_pomodoro_record", "record": rec},
+                        {"op": "set_pomodoro_state", "state": data["pomodoro_state"]},
+                    )
                     st.session_state.pomodoro_running = False
                     st.session_state.pomodoro_start = None
                     st.session_state.pomodoro_duration = 0
 
-        total_seconds = sum(r.get("seconds", 0) for r in data["pomodoro_records"])
-        if st.session_state.pomodoro_running and st.session_state.pomodoro_start:
-            elapsed = int(time.time() - st.session_state.pomodoro_start)
-            elapsed = max(0, min(elapsed, int(st.session_state.pomodoro_duration or 0)))
-            total_seconds += elapsed
-        h = total_seconds // 3600
-        m = (total_seconds % 3600) // 60
-        st.markdown(f"<div class='focus-text'>你已专注了{h}小时{m}分钟</div>", unsafe_allow_html=True)
+        recorded_seconds = data["pomodoro_total_seconds"]
 
-        st.markdown(f"<div class='timer-text'>{format_seconds(remaining)}</div>", unsafe_allow_html=True)
+        timer_ticking = st.session_state.pomodoro_running and remaining > 0
+        if timer_ticking:
+            duration = int(st.session_state.pomodoro_duration)
+            components.html(pomodoro_countdown_html(duration, duration - remaining, recorded_seconds), height=120)
+            finish_at = st.session_state.pomodoro_start + duration
+
+            def _wake_on_finish():
+                # the full script run records the finished session
+                if time.time() >= finish_at:
+                    safe_rerun()
+
+            # the browser counts down; the server only wakes up again when the timer ends
+            if st_fragment is not None:
+                st_fragment(run_every=remaining + 1)(_wake_on_finish)()
+        else:
+            h = recorded_seconds // 3600
+            m = (recorded_seconds % 3600) // 60
+            st.markdown(f"<div class='focus-text'>你已专注了{h}小时{m}分钟</div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='timer-text'>{format_seconds(remaining)}</div>", unsafe_allow_html=True)
 
         preset_rows = [st.columns(3) for _ in range(3)]
         presets = [
@@ -1961,110 +2324,82 @@ if selected_page == "番茄钟":
                         "start": start_ts,
                         "duration": mins * 60,
                     }
-                    persist_data(data)
+                    persist_data(data, {"op": "set_pomodoro_state", "state": data["pomodoro_state"]})
                     safe_rerun()
 
         if st.button("取消"):
             if st.session_state.pomodoro_running:
                 elapsed = int(time.time() - st.session_state.pomodoro_start)
+                ops = []
                 if elapsed >= int(st.session_state.pomodoro_duration * 0.8):
                     rec = {
-                        "start": now_local().strftime("%Y-%m-%d %H:%M:%S"),
+                        "start": run_now.strftime("%Y-%m-%d %H:%M:%S"),
                         "seconds": st.session_state.pomodoro_duration,
                     }
                     data["pomodoro_records"].append(rec)
+                    data["pomodoro_total_seconds"] += rec["seconds"]
+                    ops.append({"op": "add_pomodoro_record", "record": rec})
                 data["pomodoro_state"] = {"running": False, "start": None, "duration": 0}
-                persist_data(data)
+                ops.append({"op": "set_pomodoro_state", "state": data["pomodoro_state"]})
+                persist_data(data, *ops)
             st.session_state.pomodoro_running = False
             st.session_state.pomodoro_start = None
             st.session_state.pomodoro_duration = 0
             safe_rerun()
 
-        if st.session_state.pomodoro_running and remaining > 0:
-            if not maybe_autorefresh(1000, "pomodoro_autorefresh"):
-                st.caption("计时进行中，点击任意按钮或切换页面可更新倒计时。")
+        if timer_ticking and st_fragment is None:
+            if not maybe_autorefresh((remaining + 1) * 1000, "pomodoro_autorefresh"):
+                st.caption("计时进行中，结束后点击任意按钮或切换页面即可记录本次专注。")
 
 if selected_page == "统计":
     st.markdown("<div class='section-title'>统计</div>", unsafe_allow_html=True)
-    totals = {c: 0 for c in CATEGORIES}
-    for ev in data["events"]:
-        try:
-            start_dt = datetime.strptime(ev["start"], "%H:%M")
-            end_dt = datetime.strptime(ev["end"], "%H:%M")
-            minutes = int((end_dt - start_dt).total_seconds() / 60)
-            if minutes < 0:
-                minutes += 24 * 60
-            totals[ev.get("category", "其他")] += minutes
-        except Exception:
-            continue
-
+    stat_events = data["events"]
+    starts = np.fromiter((ev["start_min"] for ev in stat_events), dtype=np.int32, count=len(stat_events))
+    ends = np.fromiter((ev["end_min"] for ev in stat_events), dtype=np.int32, count=len(stat_events))
+    cats = np.array([ev.get("category", "其他") for ev in stat_events], dtype=object)
+    # events ending past midnight wrap around
+    durations = (ends - starts) % (24 * 60)
+    totals = tuple(int(durations[cats == c].sum()) for c in CATEGORIES)
+
+    bar_fig, pie_fig = build_stats_figures(totals)
     fig_col1, fig_col2 = st.columns(2)
     with fig_col1:
-        bar_fig = go.Figure(
-            data=[
-                go.Bar(
-                    x=list(totals.keys()),
-                    y=list(totals.values()),
-                    marker_color=[CATEGORY_COLORS[c] for c in totals.keys()],
-                )
-            ]
-        )
-        bar_fig.update_layout(
-            title="本周分类时长",
-            yaxis_title="分钟",
-            height=360,
-            margin=dict(l=40, r=20, t=60, b=40),
-            font=dict(family="Microsoft YaHei, SimHei, Arial", size=14),
-        )
-        st.plotly_chart(bar_fig, use_container_width=True)
-
+        st.plotly_chart(bar_fig, use_container_width=True, config=STATS_CHART_CONFIG)
     with fig_col2:
-        values = [v for v in totals.values() if v > 0]
-        labels = [k for k, v in totals.items() if v > 0]
-        if values:
-            pie_fig = go.Figure(
-                data=[
-                    go.Pie(
-                        labels=labels,
-                        values=values,
-                        textinfo="percent",
-                        insidetextorientation="radial",
-                        marker=dict(colors=[CATEGORY_COLORS[k] for k in labels]),
-                    )
-                ]
-            )
-        else:
-            pie_fig = go.Figure()
-            pie_fig.add_annotation(text="暂无数据", x=0.5, y=0.5, showarrow=False)
-        pie_fig.update_layout(
-            title="分类占比",
-            height=360,
-            margin=dict(l=20, r=20, t=60, b=40),
-            font=dict(family="Microsoft YaHei, SimHei, Arial", size=14),
-        )
-        st.plotly_chart(pie_fig, use_container_width=True)
+        st.plotly_chart(pie_fig, use_container_width=True, config=STATS_CHART_CONFIG)
 
 if selected_page == "往期回顾":
     st.markdown("<div class='section-title'>往期回顾</div>", unsafe_allow_html=True)
     with st.form("add_archive"):
-        a_date = st.date_input("日期", value=today_local(), key="archive_date")
+        a_date = st.date_input("日期", value=run_today, key="archive_date")
         a_text = st.text_area("说说你的想法")
         a_cat = st.selectbox("类型", CATEGORIES, key="archive_cat")
         submitted = st.form_submit_button("保存")
         if submitted:
-            data["archives"].append({
-                "id": str(uuid.uuid4()),
-                "date": a_date.strftime("%Y-%m-%d"),
+            archive = {
+                "id": secrets.token_urlsafe(8),
+                "date": a_date.isoformat(),
                 "category": a_cat,
                 "text": a_text.strip(),
-            })
-            persist_data(data)
+            }
+            bisect.insort_right(data["archives"], archive, key=archive_sort_key)
+            persist_data(data, {"op": "add_archive", "archive": archive})
             st.success("已保存")
 
-    for item in sorted(data.get("archives", []), key=lambda x: x["date"], reverse=True):
+    # archives are stored oldest first; walk backwards and render one page at a time
+    archives = data["archives"]
+    visible = st.session_state.setdefault("archive_visible", ARCHIVE_PAGE_SIZE)
+    stop = max(len(archives) - visible, 0)
+    for idx in range(len(archives) - 1, stop - 1, -1):
+        item = archives[idx]
         with st.expander(f"{item['date']} · {item.get('category', '-')}"):
             st.write(item.get("text", ""))
             if st.button("删除", key=f"del_arc_{item['id']}"):
-                data["archives"] = [a for a in data["archives"] if a["id"] != item["id"]]
-                persist_data(data)
-                safe_rerun()
\ No newline at end of file
+                del archives[idx]
+                persist_data(data, {"op": "delete_archive", "id": item["id"]})
+                safe_rerun()
+    if stop > 0 and st.button("更多", key="archive_more"):
+        st.session_state.archive_visible = visible + ARCHIVE_PAGE_SIZE
+        safe_rerun()
+
+flush_pending_save()